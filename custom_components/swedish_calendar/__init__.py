@@ -21,6 +21,7 @@ from .const import (
     CONF_RETENTION,
     CONF_SPECIAL_THEMES,
     CONF_SPECIAL_THEMES_DIR,
+    CONF_STALE_WHILE_REVALIDATE,
     DOMAIN,
     SENSOR_TYPES,
     SPECIAL_THEMES_FILE_NAME,
@@ -51,6 +52,7 @@ async def async_setup_entry(hass: HomeAssistant, entry: config_entries.ConfigEnt
 
     # Fetch initial data so we have data when entities subscribe
     await data_coordinator.async_refresh()
+    entry.async_on_unload(data_coordinator.async_schedule_maintenance())
 
     hass.data.setdefault(DOMAIN, {})
     hass.data[DOMAIN][entry.entry_id] = {
@@ -118,5 +120,6 @@ def get_cache_config(config: dict) -> CacheConfig:
     return CacheConfig(
         enabled=cache_config[CONF_ENABLED],
         cache_dir=cache_config[CONF_DIR],
-        retention=retention
+        retention=retention,
+        stale_while_revalidate=cache_config.get(CONF_STALE_WHILE_REVALIDATE) or False
     )
@@ -1,90 +1,191 @@
 import asyncio
-from collections import deque
-from datetime import date, datetime, timedelta, timezone
-from functools import partial
+import calendar
+from collections.abc import Callable
+from datetime import date, datetime, timedelta
+from functools import lru_cache, partial
 import hashlib
 import json
 import logging
 import os
+import threading
+import time
 from typing import Any
 
 import aiohttp
 import async_timeout
 
-from homeassistant.core import HomeAssistant
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.event import async_track_time_interval
 
 from .types import ApiData, CacheConfig
-from .utils import DateUtils
+from .utils import DateUtils, LoopBlockingTimer, LruCache, SingleFlight
 
 _LOGGER = logging.getLogger(__name__)
 
+_MAX_PARALLEL_REQUESTS = 4
+# The overhead of one request, expressed as a number of downloaded days. With this cost a whole year is cheaper
+# than 8+ months, and a month is cheaper than 3+ single days.
+_REQUEST_COST_IN_DAYS = 20
+_MEMORY_CACHE_MONTHS = 36
+_COMPACTION_INTERVAL = timedelta(days=1)
+_STALE_RETENTION_FACTOR = 4  # Expired days are kept until 4x retention in stale-while-revalidate mode
+_BASE_URL = 'https://sholiday.faboul.se/dagar/v2.1/'
+_LEGACY_URL_YEARS = range(1970, 2101)  # Years that the old one-file-per-url cache can have files for
+_MIGRATION_MARKER_FILE_NAME = 'api_data.migrated'  # Written once the old one-file-per-url cache is removed
+
 
 class ApiDataProvider:
-    def __init__(self, hass: HomeAssistant, session: aiohttp.ClientSession, cache_config: CacheConfig):
-        self._base_url: str = 'https://sholiday.faboul.se/dagar/v2.1/'
+    _in_flight_urls = SingleFlight()  # Shared by all providers
+
+    def __init__(self,
+                 hass: HomeAssistant,
+                 session: aiohttp.ClientSession,
+                 cache_config: CacheConfig,
+                 max_parallel_requests: int = _MAX_PARALLEL_REQUESTS,
+                 on_revalidated: Callable[[list[ApiData]], None] | None = None):
+        self._hass = hass
+        self._base_url: str = _BASE_URL
         self._session = session
         self._cache = ApiDataCache(hass, cache_config)
+        self._max_parallel_requests = max_parallel_requests
+        self._on_revalidated = on_revalidated
+        self._revalidate_task: asyncio.Task | None = None
+        self.loop_blocking_time = 0.0  # Seconds fetch_data spent on the event loop during the last call
+
+    @callback
+    def async_schedule_cache_compaction(self) -> CALLBACK_TYPE:
+        return self._cache.async_schedule_compaction()
+
+    @callback
+    def async_cancel_revalidation(self) -> None:
+        if self._revalidate_task is not None and not self._revalidate_task.done():
+            self._revalidate_task.cancel()
 
     async def fetch_data(self, start: date, end: date) -> list[ApiData]:
-        urls = deque(self._get_urls(start, end))
-        urls_retries = {url: 0 for url in urls}
+        loop_timer = LoopBlockingTimer()
+        lookup = await self._cache.lookup(start, end)
 
-        max_tries = 3
-        all_api_data = []
-        while len(urls) > 0:
-            url = urls.popleft()
-            tries = urls_retries[url]+1
+        with loop_timer.measure():
+            all_api_data = lookup.hits
+            cached_days = len(lookup.hits)
+            days_to_fetch = lookup.missing
+            if self._cache.config.stale_while_revalidate and len(lookup.stale) > 0:
+                # Serve expired days right away, and fetch new versions of them in the background
+                all_api_data.update(lookup.stale)
+                days_to_fetch = [day for day in lookup.missing if day.isoformat() not in lookup.stale]
+                days_to_revalidate = [day for day in lookup.missing if day.isoformat() in lookup.stale]
+                if self._revalidate_task is None or self._revalidate_task.done():
+                    self._revalidate_task = self._hass.async_create_background_task(
+                        self._async_revalidate(days_to_revalidate),
+                        name=f'Revalidate {len(days_to_revalidate)} cached days')
+                else:
+                    # The stale days are revalidated by a later fetch, once the running revalidation is done
+                    _LOGGER.debug("Revalidation already running, not revalidating %d days", len(days_to_revalidate))
 
-            if tries > max_tries:
-                _LOGGER.info(f"Ignoring url {url}, exceeded max tries")
-                continue
+        all_api_data.update(await self._fetch_days(days_to_fetch, loop_timer))
 
-            try:
-                json_data = await self._get_json_from_url(url, tries*10)
-                current_api_data = self._to_api_data(json_data, start, end)
-                all_api_data.extend(current_api_data)
-            except aiohttp.ClientError as err:
-                _LOGGER.warning('Error when calling: %s, %s', url, str(err))
-            except asyncio.TimeoutError as err:
-                _LOGGER.warning('Timeout when calling: %s', url)
-                # Retry url
-                urls_retries[url] = tries
-                urls.append(url)
-            except json.JSONDecodeError as err:
-                _LOGGER.error("Invalid json, error: %s", err)
+        with loop_timer.measure():
+            # Iso dates sort in date order
+            api_data = [all_api_data[iso_date] for iso_date in sorted(all_api_data)]
 
-        return all_api_data
+        self.loop_blocking_time = loop_timer.seconds
+        _LOGGER.debug("Fetched %d days (%d from cache, %d stale), blocking the event loop for %.2f ms",
+                      len(api_data), cached_days, len(lookup.stale), self.loop_blocking_time * 1000)
+        return api_data
+
+    async def _async_revalidate(self, days: list[date]) -> None:
+        revalidated = await self._fetch_days(days, LoopBlockingTimer())
+        _LOGGER.debug("Revalidated %d of %d stale days", len(revalidated), len(days))
+        if self._on_revalidated is not None and len(revalidated) > 0:
+            self._on_revalidated([revalidated[iso_date] for iso_date in sorted(revalidated)])
+
+    async def _fetch_days(self, days: list[date], loop_timer: LoopBlockingTimer) -> dict[str, ApiData]:
+        """Fetch and cache the days online, returns the ApiData of the wanted days keyed by iso date."""
+        if len(days) == 0:
+            return {}
+
+        with loop_timer.measure():
+            urls = self._get_urls(days)
+            in_flight = asyncio.Semaphore(self._max_parallel_requests)
+
+        # Concurrent callers of the same url share one request, every caller caches with its own config
+        days_json_per_url = await asyncio.gather(*[
+            ApiDataProvider._in_flight_urls.run(url, partial(self._fetch_url, url=url, in_flight=in_flight))
+            for url in urls
+        ])
+        days_json = [day_json for url_days_json in days_json_per_url for day_json in url_days_json]
+        await self._cache.update(days_json)  # One cache write per fetch
+
+        with loop_timer.measure():
+            wanted = {day.isoformat() for day in days}
+            api_data = {day_json['datum']: ApiData.from_json(day_json)
+                        for day_json in days_json
+                        if day_json['datum'] in wanted}
+
+        return api_data
+
+    async def _fetch_url(self, url: str, in_flight: asyncio.Semaphore) -> list[dict[str, Any]]:
+        max_tries = 3
+        for tries in range(1, max_tries + 1):
+            # Only hold the slot during the actual call, so that retries do not block other urls
+            async with in_flight:
+                try:
+                    json_data = await self._get_data_online(url, tries*10)
+                    return json_data['dagar']
+                except aiohttp.ClientError as err:
+                    _LOGGER.warning('Error when calling: %s, %s', url, str(err))
+                    return []
+                except asyncio.TimeoutError:
+                    _LOGGER.warning('Timeout when calling: %s', url)
+                except json.JSONDecodeError as err:
+                    _LOGGER.error("Invalid json, error: %s", err)
+                    return []
 
-    def _get_urls(self, start: date, end: date) -> list[str]:
+        _LOGGER.info(f"Ignoring url {url}, exceeded max tries")
+        return []
+
+    def _get_urls(self, days: list[date]) -> list[str]:
         return [f'{self._base_url}{date_pattern}' for date_pattern in
-                ApiDataProvider._get_url_patterns_for_date_range(start, end)]
+                ApiDataProvider._get_url_patterns_for_dates(days)]
 
     @staticmethod
     def _get_url_patterns_for_date_range(start: date, end: date) -> list[str]:
-        if start.year != end.year:
-            # Different years -> get all days for each year
-            return [str(year) for year in range(start.year, end.year + 1)]
-        elif start.month != end.month:
-            # Different months -> get all days for each month
-            return [f'{start.year}/{month}' for month in range(start.month, end.month + 1)]
-        elif start.day != end.day:
-            # Different days -> get all days for that month
-            return [f'{start.year}/{start.month}']
-        else:
-            # Same day -> get the day
-            return [f'{start.year}/{start.month}/{start.day}']
+        return ApiDataProvider._get_url_patterns_for_dates(list(DateUtils.range(start, end)))
 
-    async def _get_json_from_url(self, url, timeout) -> dict[str, Any]:
-        if self._cache.has_data_for(url):
-            _LOGGER.debug("Using cached version of url: %s", url)
-            data = await self._cache.get(url)
-        else:
-            data = await self._get_data_online(url, timeout)
-            await self._cache.update(url, data)
+    @staticmethod
+    def _get_url_patterns_for_dates(days: list[date]) -> list[str]:
+        """Get the cheapest set of year, year/month and year/month/day patterns covering all (sorted) days.
+
+        Every pattern costs one request plus the number of days it contains.
+        """
+        days_per_month: dict[int, dict[int, list[int]]] = {}
+        for day in days:
+            days_per_month.setdefault(day.year, {}).setdefault(day.month, []).append(day.day)
+
+        patterns = []
+        for (year, months) in days_per_month.items():
+            months_cost = 0
+            month_patterns = []
+            for (month, days_in_month_to_fetch) in months.items():
+                month_cost = _REQUEST_COST_IN_DAYS + calendar.monthrange(year, month)[1]
+                days_cost = len(days_in_month_to_fetch) * (_REQUEST_COST_IN_DAYS + 1)
+
+                if days_cost < month_cost:
+                    months_cost += days_cost
+                    month_patterns.extend([f'{year}/{month}/{day}' for day in days_in_month_to_fetch])
+                else:
+                    months_cost += month_cost
+                    month_patterns.append(f'{year}/{month}')
+
+            year_cost = _REQUEST_COST_IN_DAYS + (366 if calendar.isleap(year) else 365)
+            if year_cost < months_cost:
+                patterns.append(str(year))
+            else:
+                patterns.extend(month_patterns)
 
-        return data
+        return patterns
 
-    async def _get_data_online(self, url, timeout):
+    async def _get_data_online(self, url, timeout) -> dict[str, Any]:
         _LOGGER.debug(f'Calling {url} with timeout {timeout} seconds')
         with async_timeout.timeout(timeout):
             resp = await self._session.get(url)
@@ -96,63 +197,251 @@ class ApiDataProvider:
             data: dict[str, Any] = json.loads(response_data)
             return data
 
-    @staticmethod
-    def _to_api_data(json_response: dict[str, Any], start: date, end: date) -> list[ApiData]:
-        all_data = [ApiData.from_json(data_per_date) for data_per_date in json_response["dagar"]]
-        wanted_data = list(filter(lambda api_data: DateUtils.in_range(api_data.date, start, end), all_data))
-        return wanted_data
+
+class CacheLookup:
+    def __init__(self, hits: dict[str, ApiData], missing: list[date], stale: dict[str, ApiData] | None = None):
+        self.hits = hits  # Keyed by iso date
+        self.missing = missing
+        self.stale = stale or {}  # Missing days that are present in the cache but older than the retention
 
 
 class ApiDataCache:
-    def __init__(self, hass: HomeAssistant, cache_config: CacheConfig):
+    """Date indexed cache, storing the json of every fetched day once in a single file."""
+
+    _FILE_NAME = 'api_data.json'
+    _VERSION = 1
+    _lock = threading.Lock()
+    _writes: dict[str, int] = {}  # Number of writes per cache file in this process, shared by all caches
+
+    def __init__(self, hass: HomeAssistant, cache_config: CacheConfig, memory_capacity: int = _MEMORY_CACHE_MONTHS):
         self._hass = hass
         self.config = cache_config
+        self._path = os.path.join(self.config.cache_dir, ApiDataCache._FILE_NAME)
+        # Decoded days per (year, month), valid as long as the cache file has the same version
+        self.memory_cache = LruCache(memory_capacity)
+        self._memory_cache_version: tuple[int, int, int] | None = None
+        self._last_used: dict[str, float] = {}  # Last time each iso date was served from the cache
+
+    async def lookup(self, start: date, end: date) -> CacheLookup:
+        """Look up all days in range in a single executor job, returning both hits and misses."""
+        if not self.config.enabled:
+            return CacheLookup(hits={}, missing=list(DateUtils.range(start, end)))
+        return await self._hass.async_add_executor_job(partial(self._lookup, start=start, end=end))
+
+    def _lookup(self, start: date, end: date) -> CacheLookup:
+        with ApiDataCache._lock:
+            cached_months = self._get_months(start, end)
+
+        now = time.time()
+        oldest_allowed = now - self.config.retention.total_seconds()
+        hits = {}
+        missing = []
+        stale = {}
+        for day in DateUtils.range(start, end):
+            cached_day = cached_months[(day.year, day.month)].get(day.isoformat())
+            if cached_day is not None and cached_day[0] >= oldest_allowed:
+                hits[day.isoformat()] = cached_day[1]
+            else:
+                missing.append(day)
+                if cached_day is not None:
+                    stale[day.isoformat()] = cached_day[1]
 
-    def has_data_for(self, url: str) -> bool:
-        return self.config.enabled and \
-               os.path.exists(self._url_to_path(url)) and \
-               self._cache_age(url) <= self.config.retention
-
-    def _url_to_path(self, url: str) -> str:
-        hashed_name = hashlib.md5(url.encode())
-        filename = f'{hashed_name.hexdigest()}.json'
-        return os.path.join(self.config.cache_dir, filename)
-
-    def _cache_age(self, url) -> timedelta:
-        path = self._url_to_path(url)
-        modified_time = os.path.getmtime(path)
-        cache_in_utc = datetime.fromtimestamp(modified_time, tz=timezone.utc)
-        now_in_utc = datetime.now().astimezone(tz=timezone.utc)
-        return now_in_utc - cache_in_utc
-
-    async def get(self, url) -> dict[str, Any] | None:
-        return await self._hass.async_add_executor_job(partial(self._get, url=url))
-
-    def _get(self, url) -> dict[str, Any] | None:
-        path = self._url_to_path(url)
-        data = None
-        with open(path) as cached_file:
+        with ApiDataCache._lock:
+            # Compaction iterates over the last used times in another thread
+            self._last_used.update(dict.fromkeys(hits, now))
+
+        _LOGGER.debug("Found %d of %d days in cache (memory cache: %d hits, %d misses, %d evictions)",
+                      len(hits), len(hits) + len(missing),
+                      self.memory_cache.hits, self.memory_cache.misses, self.memory_cache.evictions)
+        return CacheLookup(hits=hits, missing=missing, stale=stale)
+
+    def _get_months(self, start: date, end: date) -> dict[tuple[int, int], dict[str, tuple[float, ApiData]]]:
+        """Get (fetched, ApiData) per iso date for all months in range, from memory if possible, else from disk."""
+        version = self._file_version()
+        if version != self._memory_cache_version:
+            self.memory_cache.clear()
+            self._memory_cache_version = version
+
+        months = {month: self.memory_cache.get(month) for month in DateUtils.months(start, end)}
+        missing_months = {month for (month, cached_days) in months.items() if cached_days is None}
+
+        if len(missing_months) > 0:
+            for month in missing_months:
+                months[month] = {}
+            for (iso_date, cached_day) in self._load().items():
+                month = (int(iso_date[0:4]), int(iso_date[5:7]))
+                if month in missing_months:
+                    months[month][iso_date] = (cached_day['fetched'], ApiData.from_json(cached_day['data']))
+            for month in missing_months:
+                self.memory_cache.put(month, months[month])
+
+        return months
+
+    async def update(self, days_json: list[dict[str, Any]]) -> None:
+        if self.config.enabled and len(days_json) > 0:
+            await self._hass.async_add_executor_job(partial(self._update, days_json=days_json))
+
+    def _update(self, days_json: list[dict[str, Any]]) -> None:
+        fetched = time.time()
+        with ApiDataCache._lock:
+            memory_cache_version = self._file_version()
+            memory_cache_is_valid = memory_cache_version is not None and \
+                memory_cache_version == self._memory_cache_version
+            cached_days = self._load()
+            for day_json in days_json:
+                cached_days[day_json['datum']] = {'fetched': fetched, 'data': day_json}
+            self._save(cached_days)
+
+            if memory_cache_is_valid:
+                # Untouched months in memory are identical to what was just written, only drop the updated ones
+                for day_json in days_json:
+                    self.memory_cache.pop((int(day_json['datum'][0:4]), int(day_json['datum'][5:7])))
+                self._memory_cache_version = self._file_version()
+        _LOGGER.debug("Cached %d days in %s", len(days_json), self._path)
+
+    @callback
+    def async_schedule_compaction(self) -> CALLBACK_TYPE:
+        """Compact the cache now and then once a day, returns a callback that cancels the schedule."""
+        compact_task = self._hass.async_create_background_task(self._async_compact(), name='Compact api data cache')
+        unsubscribe = async_track_time_interval(self._hass, self._async_compact, _COMPACTION_INTERVAL)
+
+        @callback
+        def _async_cancel() -> None:
+            unsubscribe()
+            compact_task.cancel()
+
+        return _async_cancel
+
+    async def _async_compact(self, _now: datetime | None = None) -> int:
+        if not self.config.enabled:
+            return 0
+        return await self._hass.async_add_executor_job(self._compact)
+
+    def _compact(self) -> int:
+        """Remove expired days, files from the old one-file-per-url format and enforce max_size.
+
+        In stale-while-revalidate mode expired days are kept for a while longer, so that they can still be served.
+        When the cache is too large, the days that were least recently used (or fetched) are evicted first.
+        Returns the number of bytes reclaimed.
+        """
+        with ApiDataCache._lock:
+            size_before = self._size_on_disk()
+            self._migrate_legacy_files()
+            if os.path.exists(f'{self._path}.tmp'):
+                os.remove(f'{self._path}.tmp')  # Left behind by a crash while saving
+
+            max_age = self.config.retention * (_STALE_RETENTION_FACTOR if self.config.stale_while_revalidate else 1)
+            oldest_allowed = time.time() - max_age.total_seconds()
+            cached_days = {iso_date: cached_day for (iso_date, cached_day) in self._load().items()
+                           if cached_day['fetched'] >= oldest_allowed}
+
+            # Size of every '"iso_date":{...},' entry in the saved file, the last entry has no comma
+            day_sizes = {iso_date: len(json.dumps(iso_date)) + len(json.dumps(cached_day, separators=(',', ':'))) + 2
+                         for (iso_date, cached_day) in cached_days.items()}
+            total_size = len(ApiDataCache._serialize({})) + sum(day_sizes.values()) - (1 if cached_days else 0)
+            if total_size > self.config.max_size:
+                least_recently_used_first = sorted(
+                    cached_days,
+                    key=lambda iso: max(cached_days[iso]['fetched'], self._last_used.get(iso, 0)))
+                for iso_date in least_recently_used_first:
+                    if total_size <= self.config.max_size:
+                        break
+                    total_size -= day_sizes[iso_date] - (1 if len(cached_days) == 1 else 0)
+                    del cached_days[iso_date]
+
+            if len(cached_days) > 0:
+                self._save(cached_days)
+            elif os.path.exists(self._path):
+                os.remove(self._path)
+            self._last_used = {iso: used for (iso, used) in self._last_used.items() if iso in cached_days}
+            self.memory_cache.clear()
+            self._memory_cache_version = None
+
+            reclaimed = max(size_before - self._size_on_disk(), 0)
+
+        _LOGGER.info("Compacted cache in %s, kept %d days, reclaimed %d bytes",
+                     self.config.cache_dir, len(cached_days), reclaimed)
+        return reclaimed
+
+    def _migrate_legacy_files(self) -> None:
+        """Remove the files of the old one-file-per-url cache, once.
+
+        cache_dir can be shared with other files, so only files named after an url of this integration are removed.
+        """
+        if not os.path.isdir(self.config.cache_dir) or os.path.exists(self._migration_marker_path()):
+            return
+
+        for file_name in self._legacy_file_names():
+            _LOGGER.debug("Removing %s from the old cache format", file_name)
+            os.remove(os.path.join(self.config.cache_dir, file_name))
+        with open(self._migration_marker_path(), 'w'):
+            pass
+
+    def _legacy_file_names(self) -> list[str]:
+        if not os.path.isdir(self.config.cache_dir) or os.path.exists(self._migration_marker_path()):
+            return []
+        legacy_file_names = _legacy_file_names()
+        return [file_name for file_name in os.listdir(self.config.cache_dir) if file_name in legacy_file_names]
+
+    def _migration_marker_path(self) -> str:
+        return os.path.join(self.config.cache_dir, _MIGRATION_MARKER_FILE_NAME)
+
+    def _size_on_disk(self) -> int:
+        files = [ApiDataCache._FILE_NAME, f'{ApiDataCache._FILE_NAME}.tmp'] + self._legacy_file_names()
+        paths = [os.path.join(self.config.cache_dir, file_name) for file_name in files]
+        return sum(os.path.getsize(path) for path in paths if os.path.exists(path))
+
+    def _file_version(self) -> tuple[int, int, int] | None:
+        """Changes on every write, the mtime alone does not on file systems with a coarse mtime (FAT, SD cards)."""
+        try:
+            stat = os.stat(self._path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size, ApiDataCache._writes.get(self._path, 0)
+
+    def _load(self) -> dict[str, dict[str, Any]]:
+        if not os.path.exists(self._path):
+            return {}
+
+        with open(self._path) as cache_file:
             try:
-                data = json.load(cached_file)
+                stored = json.load(cache_file)
+                if stored.get('version') == ApiDataCache._VERSION:
+                    return stored['days']
+                _LOGGER.info("Cache file %s has an old format, ignoring it", self._path)
             except json.JSONDecodeError as err:
-                _LOGGER.error("Invalid json in cached file: %s, removing. Error: %s", path, err)
-                os.remove(path)
+                _LOGGER.error("Invalid json in cached file: %s, removing. Error: %s", self._path, err)
+                os.remove(self._path)
 
-        return data
+        return {}
 
-    async def update(self, url, data: dict[str, Any]) -> None:
-        return await self._hass.async_add_executor_job(partial(self._update, url=url, data=data))
+    def _save(self, cached_days: dict[str, dict[str, Any]]) -> None:
+        self._assert_path_directories_exist()
+        tmp_path = f'{self._path}.tmp'
+        with open(tmp_path, 'w') as cache_file:
+            cache_file.write(ApiDataCache._serialize(cached_days))
+        os.replace(tmp_path, self._path)  # Atomic, a crash never leaves a half written cache
+        ApiDataCache._writes[self._path] = ApiDataCache._writes.get(self._path, 0) + 1
 
-    def _update(self, url, data: dict[str, Any]) -> None:
-        if self.config.enabled:
-            path = self._url_to_path(url)
-            _LOGGER.debug("Caching %s, saving to %s", url, path)
-            self._assert_path_directories_exist()
-            with open(path, 'w') as cache_file:
-                cache_file.write(json.dumps(data))
-                _LOGGER.debug("%s updated", path)
+    @staticmethod
+    def _serialize(cached_days: dict[str, dict[str, Any]]) -> str:
+        # Ascii only, so the length is the size of the file
+        return json.dumps({'version': ApiDataCache._VERSION, 'days': cached_days}, separators=(',', ':'))
 
     def _assert_path_directories_exist(self):
         if not os.path.exists(self.config.cache_dir):
             _LOGGER.debug("%s does not exist, creating", self.config.cache_dir)
             os.makedirs(self.config.cache_dir, exist_ok=True)
+
+
+@lru_cache(maxsize=1)
+def _legacy_file_names() -> frozenset[str]:
+    """md5(url).json of every url the old cache could have stored, years, months and days."""
+    patterns = []
+    for year in _LEGACY_URL_YEARS:
+        patterns.append(str(year))
+        for month in range(1, 13):
+            patterns.append(f'{year}/{month}')
+            patterns.extend(f'{year}/{month}/{day}' for day in range(1, calendar.monthrange(year, month)[1] + 1))
+    return frozenset(f'{hashlib.md5(f"{_BASE_URL}{pattern}".encode(), usedforsecurity=False).hexdigest()}.json'
+                     for pattern in patterns)
@@ -26,6 +26,7 @@ from .const import (
     CONF_RETENTION,
     CONF_SPECIAL_THEMES,
     CONF_SPECIAL_THEMES_DIR,
+    CONF_STALE_WHILE_REVALIDATE,
     DOMAIN,
     DOMAIN_FRIENDLY_NAME,
     SENSOR_TYPES,
@@ -120,6 +121,8 @@ class SwedishCalendarConfigFlow(ConfigFlow, domain=DOMAIN):
                 vol.Optional(CONF_ENABLED, default=entry_data.get(CONF_ENABLED) or False): cv.boolean,
                 vol.Optional(CONF_DIR, default=entry_data.get(CONF_DIR) or default_dir): cv.string,
                 vol.Optional(CONF_RETENTION, default=entry_data.get(CONF_RETENTION) or 7): cv.positive_int,
+                vol.Optional(CONF_STALE_WHILE_REVALIDATE,
+                             default=entry_data.get(CONF_STALE_WHILE_REVALIDATE) or False): cv.boolean,
             },
         )
 
@@ -211,6 +214,7 @@ class SwedishCalendarConfigFlow(ConfigFlow, domain=DOMAIN):
                                                                           CONF_DEFAULT_CACHE_DIR),
             CONF_RETENTION: imported_cache_config.get(
                 CONF_RETENTION).days if CONF_RETENTION in imported_cache_config else 7,
+            CONF_STALE_WHILE_REVALIDATE: imported_cache_config.get(CONF_STALE_WHILE_REVALIDATE) or False,
         }
 
         imported_calendar_config = import_data.get(CONF_CALENDAR) or {}
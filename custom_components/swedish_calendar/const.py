@@ -14,6 +14,7 @@ CONF_CACHE = 'cache'
 CONF_DEFAULT_CACHE_DIR = '.cache'
 CONF_ENABLED = 'enabled'
 CONF_RETENTION = 'retention'
+CONF_STALE_WHILE_REVALIDATE = 'stale_while_revalidate'
 
 CONF_ATTRIBUTION = 'Data provided by sholiday.faboul.se'
 CONF_ATTRIBUTION_SPECIAL_THEMES = 'Data provided by https://temadagar.se. For full calendar, ' \
@@ -91,6 +92,13 @@ SENSOR_TYPES = {
         default_value='Nej',
         attribution=CONF_ATTRIBUTION
     ),
+    'bridge_day': SensorConfig(
+        friendly_name='Bridge day',
+        icon='mdi:bridge',
+        swedish_calendar_attribute='bridge_day',
+        default_value='Nej',
+        attribution=CONF_ATTRIBUTION
+    ),
     'name_day': SensorConfig(
         friendly_name='Names celebrated',
         icon='mdi:human-handsup',
@@ -1,3 +1,4 @@
+import copy
 from datetime import date, datetime, timedelta
 import logging
 
@@ -5,12 +6,13 @@ from custom_components.swedish_calendar.local.themes.theme_data_local import (
     LocalThemeDataProvider,
     LocalThemeDataUpdater,
 )
-from homeassistant.core import HomeAssistant, callback
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
 from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.helpers.event import async_track_time_interval
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
 
 from .api_data import ApiDataProvider
-from .const import CONF_EXCLUDE, DOMAIN_FRIENDLY_NAME, THEME_DAY
+from .const import CONF_EXCLUDE, DOMAIN_FRIENDLY_NAME, SENSOR_TYPES, THEME_DAY
 from .local.api_data_local import LocalApiDataProvider
 from .theme_data import ThemeDataProvider, ThemeDataUpdater
 from .types import (
@@ -24,6 +26,7 @@ from .types import (
 from .utils import DateUtils
 
 _LOGGER = logging.getLogger(__name__)
+_CUSTOM_THEMES_POLL_INTERVAL = timedelta(minutes=1)
 
 
 class CalendarDataCoordinator(DataUpdateCoordinator):
@@ -37,11 +40,18 @@ class CalendarDataCoordinator(DataUpdateCoordinator):
                  conf: dict):
         """Initialize the data object."""
         self.hass = hass
-        self._themes_enabled: str = THEME_DAY not in (conf[CONF_EXCLUDE] or [])
+        excludes = conf[CONF_EXCLUDE] or []
+        self._themes_enabled: str = THEME_DAY not in excludes
+        # All sensors and calendar events but the theme day are built from api data
+        self._api_data_enabled = any(sensor_type not in excludes or sensor_type in (calendar_config.includes or [])
+                                     for sensor_type in SENSOR_TYPES if sensor_type != THEME_DAY)
         self._cache: dict[date, SwedishCalendar] = {}
         self._fetch_days_before_today = calendar_config.days_before_today
         self._fetch_days_after_today = calendar_config.days_after_today
         self._first_update = True  # Keep track of first update so that we keep boot times down
+        self.recomputed_days = 0  # Number of days fetched/generated during the last refresh
+        self._theme_generation: int | None = None  # Generation of the custom themes that the cache was built from
+        self._themes_changed = False  # Set when the special themes were updated but the cache is not rebuilt yet
 
         if is_local_mode:
             self._api_data_provider = LocalApiDataProvider(hass=hass)
@@ -49,7 +59,8 @@ class CalendarDataCoordinator(DataUpdateCoordinator):
             self._theme_provider = LocalThemeDataProvider(hass=hass)
         else:
             session = async_get_clientsession(hass)
-            self._api_data_provider = ApiDataProvider(hass=hass, session=session, cache_config=cache_config)
+            self._api_data_provider = ApiDataProvider(hass=hass, session=session, cache_config=cache_config,
+                                                      on_revalidated=self._async_revalidated)
             self._theme_data_updater = ThemeDataUpdater(hass=hass, config=special_themes_config, session=session)
             self._theme_provider = ThemeDataProvider(hass=hass, theme_path=special_themes_config.path)
 
@@ -61,6 +72,35 @@ class CalendarDataCoordinator(DataUpdateCoordinator):
             update_method=self.update_data,
         )
 
+    @callback
+    def async_schedule_maintenance(self) -> CALLBACK_TYPE:
+        """Schedule background jobs, returns a callback that cancels them."""
+        unsubscribers = []
+        if isinstance(self._api_data_provider, ApiDataProvider):
+            unsubscribers.append(self._api_data_provider.async_schedule_cache_compaction())
+            unsubscribers.append(self._api_data_provider.async_cancel_revalidation)
+        if isinstance(self._theme_provider, LocalThemeDataProvider):
+            unsubscribers.append(async_track_time_interval(self.hass, self._async_reload_custom_themes,
+                                                           _CUSTOM_THEMES_POLL_INTERVAL))
+
+        @callback
+        def _async_cancel() -> None:
+            for unsubscribe in unsubscribers:
+                unsubscribe()
+
+        return _async_cancel
+
+    async def _async_reload_custom_themes(self, _now: datetime | None = None) -> None:
+        """Pick up edited custom theme files without a restart.
+
+        The theme provider is shared by all entries, so the files may already have been reloaded by the poll of
+        another entry. The generation of the configs tells whether this entry still serves themes of older files.
+        """
+        await self._theme_provider.async_reload_changed()
+        if await self._theme_provider.async_get_generation() != self._theme_generation:
+            _LOGGER.debug("Custom themes changed, refreshing")
+            await self.async_request_refresh()
+
     @callback
     def _schedule_refresh(self) -> None:
         _LOGGER.debug("Scheduling refresh in %s at %s", self.update_interval, (datetime.now() + self.update_interval))
@@ -70,13 +110,24 @@ class CalendarDataCoordinator(DataUpdateCoordinator):
         _LOGGER.debug("Fetching new data")
 
         if self._theme_data_updater.can_update() and not self._first_update:
-            await self._theme_data_updater.update()
-
-        if self._get_start() not in self._cache or self._get_end() not in self._cache:
-            try:
-                self._cache = await self._get_calendars()
-            except Exception as err:
-                _LOGGER.warning("Failed to fetch swedish calendar: %s", err)
+            if await self._theme_data_updater.update():
+                self._theme_provider.invalidate()
+                self._themes_changed = True  # Recompute the whole window
+
+        theme_generation = self._theme_generation
+        if isinstance(self._theme_provider, LocalThemeDataProvider):
+            # Unchanged months are served from the theme provider's memory when the whole window is recomputed
+            theme_generation = await self._theme_provider.async_get_generation()
+
+        # The cache is only replaced once the new window is fetched, a failed fetch keeps serving the old window
+        recompute_window = self._themes_changed or theme_generation != self._theme_generation
+        try:
+            self._cache = await self._slide_window({} if recompute_window else self._cache,
+                                                   self._get_start(), self._get_end())
+            self._themes_changed = False
+            self._theme_generation = theme_generation
+        except Exception as err:
+            _LOGGER.warning("Failed to fetch swedish calendar: %s", err)
 
         # Recalculate update interval in case of restart
         self.update_interval = timedelta(seconds=DateUtils.seconds_until_midnight())
@@ -84,22 +135,83 @@ class CalendarDataCoordinator(DataUpdateCoordinator):
 
         return self._cache or {}
 
+    @callback
+    def _async_revalidated(self, swedish_dates: list[ApiData]) -> None:
+        """Replace stale api data that was served earlier with the revalidated data."""
+        for api_data in swedish_dates:
+            key = date.fromisoformat(api_data.date)
+            if key in self._cache:
+                # Neighbours are not revalidated together with the day, keep the bridge day it already had
+                api_data = copy.copy(api_data)
+                api_data.bridge_day = self._cache[key].get_value_by_attribute('bridge_day') or False
+                self._cache[key].with_api_data(api_data)
+
+        self.update_interval = timedelta(seconds=DateUtils.seconds_until_midnight())
+        self.async_set_updated_data(self._cache)
+
     def _get_start(self):
         return date.today() - timedelta(days=self._fetch_days_before_today)
 
     def _get_end(self):
         return date.today() + timedelta(days=self._fetch_days_after_today)
 
-    async def _get_calendars(self) -> dict[date, SwedishCalendar]:
-        start_date = self._get_start()
-        end_date = self._get_end()
+    async def _slide_window(self,
+                            cached: dict[date, SwedishCalendar],
+                            start: date,
+                            end: date) -> dict[date, SwedishCalendar]:
+        """Evict dates that fell out of the window and only fetch the dates that are missing."""
+        calendars = {day: calendar for (day, calendar) in cached.items() if start <= day <= end}
+        evicted_days = len(cached) - len(calendars)
+        missing_ranges = CalendarDataCoordinator._missing_ranges(calendars, start, end, self._api_data_enabled)
+
+        for (range_start, range_end) in missing_ranges:
+            calendars.update(await self._get_calendars(range_start, range_end))
+
+        self.recomputed_days = sum((range_end - range_start).days + 1 for (range_start, range_end) in missing_ranges)
+        _LOGGER.debug("Recomputed %d of %d days in window %s - %s, evicted %d days",
+                      self.recomputed_days, (end - start).days + 1, start, end, evicted_days)
 
+        return dict(sorted(calendars.items()))
+
+    @staticmethod
+    def _missing_ranges(calendars: dict[date, SwedishCalendar],
+                        start: date,
+                        end: date,
+                        api_data_required: bool = False) -> list[tuple[date, date]]:
+        """Ranges of days that are not cached, days without api data count as missing if api data is required."""
+        missing_ranges = []
+        range_start = None
+        for day in DateUtils.range(start, end):
+            is_missing = day not in calendars or (api_data_required and not calendars[day].has_api_data())
+            if is_missing and range_start is None:
+                range_start = day
+            elif not is_missing and range_start is not None:
+                missing_ranges.append((range_start, day - timedelta(days=1)))
+                range_start = None
+
+        if range_start is not None:
+            missing_ranges.append((range_start, end))
+
+        return missing_ranges
+
+    async def _get_calendars(self, start_date: date, end_date: date) -> dict[date, SwedishCalendar]:
+        # One day on each side is needed to tell whether the first and last days are bridge days
+        fetch_start = start_date - timedelta(days=1)
+        fetch_end = end_date + timedelta(days=1)
         themes = []
-        if self._themes_enabled:
-            themes = await self._theme_provider.fetch_data(start_date, end_date)
-        swedish_dates = await self._api_data_provider.fetch_data(start_date, end_date)
+        if isinstance(self._api_data_provider, LocalApiDataProvider):
+            # Local api data is derived from the themes, so both come out of one generation
+            (swedish_dates, local_themes) = await self._api_data_provider.fetch_calendar_data(fetch_start, fetch_end)
+            if self._themes_enabled:
+                themes = local_themes
+        else:
+            if self._themes_enabled:
+                themes = await self._theme_provider.fetch_data(start_date, end_date)
+            swedish_dates = await self._api_data_provider.fetch_data(fetch_start, fetch_end)
+        swedish_dates = ApiData.with_bridge_days(swedish_dates)
 
-        return CalendarDataCoordinator._merge(swedish_dates, themes)
+        calendars = CalendarDataCoordinator._merge(swedish_dates, themes)
+        return {day: calendar for (day, calendar) in calendars.items() if start_date <= day <= end_date}
 
     @staticmethod
     def _merge(swedish_dates: list[ApiData], themes: list[ThemeData]) -> dict[date, SwedishCalendar]:
@@ -10,7 +10,6 @@ from custom_components.swedish_calendar.local.themes.theme_data_local import (
     LocalThemeDataProvider,
 )
 from custom_components.swedish_calendar.types import ApiData, ThemeData
-from custom_components.swedish_calendar.utils import DateUtils
 from homeassistant.core import HomeAssistant
 
 _LOGGER = logging.getLogger(__name__)
@@ -26,58 +25,75 @@ class LocalApiDataProvider:
         self.name_day_provider = NameDayProvider()
 
     async def fetch_data(self, start: date, end: date) -> list[ApiData]:
-        themes = await self.theme_data_provider.fetch_data(start, end)
-        return await self.hass.async_add_executor_job(partial(self._fetch_data, start=start, end=end, themes=themes))
+        (api_data, _) = await self.fetch_calendar_data(start, end)
+        return api_data
 
-    def _fetch_data(self, start: date, end: date, themes: list[ThemeData]) -> list[ApiData]:
-        all_api_data = []
+    async def fetch_calendar_data(self, start: date, end: date) -> tuple[list[ApiData], list[ThemeData]]:
+        """Generate themes once, and derive both api data and the themes of [start, end] from them."""
+        return await self.hass.async_add_executor_job(partial(self._fetch_calendar_data, start=start, end=end))
+
+    def _fetch_calendar_data(self, start: date, end: date) -> tuple[list[ApiData], list[ThemeData]]:
+        # The day after end is needed to tell whether end is the day before a holiday
+        themes = self.theme_data_provider.get_themes(start, end + timedelta(days=1))
+        api_data = self._fetch_data(start, end, themes)
+        end_iso = end.isoformat()
+        return api_data, [theme_data for theme_data in themes if theme_data.date <= end_iso]
 
+    def _fetch_data(self, start: date, end: date, themes: list[ThemeData]) -> list[ApiData]:
         holidays = get_holidays(start, end, themes)
         flag_days = get_flag_days(start, end, themes)
 
-        for day in DateUtils.range(start, end):
-            iso_date: str = day.strftime('%Y-%m-%d')
-            iso_tomorrow = (day + timedelta(days=1)).strftime('%Y-%m-%d')
-            holidays_today = holidays[iso_date] if iso_date in holidays.keys() else []
-            holidays_tomorrow = holidays[iso_tomorrow] if iso_tomorrow in holidays.keys() else []
-            reasons_for_flagging = flag_days.get(iso_date)
-
-            work_free_today = self._is_work_free_day(day, holidays_today)
-
-            #  TODO: Klämdag -> igår och imorgon är arbetsfri
-            all_api_data.append(
-                ApiData(
-                    date=iso_date,
-                    weekday=self._get_weekday(day),
-                    week=day.isocalendar().week,
-                    day_of_week_index=day.isoweekday(),
-                    red_day=self._is_red_day(day, holidays_today),
-                    work_free_day=work_free_today,
-                    eve=self._eve(holidays_today),
-                    holiday=self._holiday(holidays_today),
-                    day_before_work_free_holiday=self._is_work_free_holiday(holidays_tomorrow) and not work_free_today,
-                    reason_for_flagging=', '.join(reasons_for_flagging) if reasons_for_flagging is not None else "",
-                    name_day=self.name_day_provider.get_names(day.strftime('%m-%d'))
-                )
+        # Every column is computed for the whole range first, records are only built at the end.
+        # Columns have one extra day after end, needed for day_before_work_free_holiday of end.
+        day_count = (end - start).days + 1
+        days = [date.fromordinal(ordinal) for ordinal in range(start.toordinal(), start.toordinal() + day_count + 1)]
+        iso_dates = [day.isoformat() for day in days]
+        weekdays = [(start.weekday() + n) % 7 for n in range(day_count + 1)]
+        weeks = LocalApiDataProvider._iso_weeks(days, weekdays)
+        holidays_by_day = [holidays.get(iso_date, []) for iso_date in iso_dates]
+
+        work_free_holidays = [self._is_work_free_holiday(holidays_today) if holidays_today else False
+                              for holidays_today in holidays_by_day]
+        red_holidays = [any(config.red_day for (_, config) in holidays_today) if holidays_today else False
+                        for holidays_today in holidays_by_day]
+        work_free_days = [weekday >= 5 or work_free_holiday
+                          for (weekday, work_free_holiday) in zip(weekdays, work_free_holidays)]
+        red_days = [weekday == 6 or red_holiday for (weekday, red_holiday) in zip(weekdays, red_holidays)]
+        eves = [self._eve(holidays_today) if holidays_today else None for holidays_today in holidays_by_day]
+        holiday_names = [self._holiday(holidays_today) if holidays_today else None
+                         for holidays_today in holidays_by_day]
+        reasons_for_flagging = [', '.join(flag_days[iso_date]) if iso_date in flag_days else ""
+                                for iso_date in iso_dates]
+        name_days = self.name_day_provider.get_names_for_range(start, end)
+
+        # Bridge days need the days around the range, they are set by the coordinator
+        return [
+            ApiData(
+                date=iso_dates[n],
+                weekday=_WEEKDAYS[weekdays[n]],
+                week=weeks[n],
+                day_of_week_index=weekdays[n] + 1,
+                red_day=red_days[n],
+                work_free_day=work_free_days[n],
+                eve=eves[n],
+                holiday=holiday_names[n],
+                day_before_work_free_holiday=work_free_holidays[n + 1] and not work_free_days[n],
+                reason_for_flagging=reasons_for_flagging[n],
+                name_day=name_days[n]
             )
-
-        return all_api_data
-
-    @staticmethod
-    def _get_weekday(day: date) -> str:
-        return _WEEKDAYS[day.weekday()]
-
-    @staticmethod
-    def _is_red_day(day: date, holidays: list[(str, StaticHolidayConfig)]) -> bool:
-        red_holiday = any([config.red_day for (_, config) in holidays])
-        is_sunday = day.isoweekday() == 7
-        return is_sunday or red_holiday
+            for n in range(day_count)
+        ]
 
     @staticmethod
-    def _is_work_free_day(day: date, holidays: list[(str, StaticHolidayConfig)]) -> bool:
-        work_free_holiday = LocalApiDataProvider._is_work_free_holiday(holidays)
-        is_weekend = day.isoweekday() >= 6
-        return is_weekend or work_free_holiday
+    def _iso_weeks(days: list[date], weekdays: list[int]) -> list[int]:
+        """ISO week of each day, the week only changes on mondays so isocalendar() is only needed then."""
+        weeks = []
+        week = days[0].isocalendar().week
+        for (day, weekday) in zip(days, weekdays):
+            if weekday == 0:
+                week = day.isocalendar().week
+            weeks.append(week)
+        return weeks
 
     @staticmethod
     def _is_work_free_holiday(holidays: list[(str, StaticHolidayConfig)]):
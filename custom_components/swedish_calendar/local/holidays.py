@@ -1,5 +1,5 @@
-import copy
 from datetime import date
+from functools import lru_cache
 
 from . import StaticHolidayConfig
 from ..types import ThemeData
@@ -35,28 +35,39 @@ _STATIC_HOLIDAY_CONFIGS = {
 }
 
 
-# TODO: Improvement here would be to not send in themes: list[ThemeData], and let this class handle source data
-#  itself
-def get_holidays(start: date, end: date, themes: list[ThemeData]) -> dict[str, list[(str, StaticHolidayConfig)]]:
-    year = min(start.year, end.year)  # TODO: What if there are multiple years?
+# Holidays whose config changed over the years, as (holiday, first year, last year, config), None means no limit
+_VERSIONED_HOLIDAY_CONFIGS = [
+    ('Svenska flaggans dag', None, 1982, _HOLIDAY),
+    ('Sveriges nationaldag', 1983, 2004, _HOLIDAY),
+    ('Sveriges nationaldag', 2005, None, _WORK_FREE_RED_HOLIDAY),
+    ('Annandag pingst', None, 2004, _WORK_FREE_RED_HOLIDAY),
+    ('Annandag pingst', 2005, None, _HOLIDAY),
+]
+
 
-    holiday_configs = copy.deepcopy(_STATIC_HOLIDAY_CONFIGS)
+@lru_cache(maxsize=64)
+def _rules_for_year(year: int) -> dict[str, StaticHolidayConfig]:
+    """Holiday configs valid in year, built once per year and shared, so callers must not modify it."""
+    rules = dict(_STATIC_HOLIDAY_CONFIGS)
+    for (holiday, first_year, last_year, config) in _VERSIONED_HOLIDAY_CONFIGS:
+        if (first_year is None or first_year <= year) and (last_year is None or year <= last_year):
+            rules[holiday] = config
 
-    if year < 1983:
-        holiday_configs['Svenska flaggans dag'] = _HOLIDAY,
-    else:
-        holiday_configs['Sveriges nationaldag'] = _WORK_FREE_RED_HOLIDAY if year >= 2005 else _HOLIDAY
+    return rules
 
-    holiday_configs['Annandag pingst'] = _HOLIDAY if year >= 2005 else _WORK_FREE_RED_HOLIDAY
 
+# TODO: Improvement here would be to not send in themes: list[ThemeData], and let this class handle source data
+#  itself
+def get_holidays(start: date, end: date, themes: list[ThemeData]) -> dict[str, list[(str, StaticHolidayConfig)]]:
     # TODO Test 2008 "helgdag": "Kristi himmelsfärdsdag, Första Maj",
 
     holidays: dict[str, list[(str, StaticHolidayConfig)]] = {}
     for theme_data in themes:
-        for holiday in holiday_configs.keys():
+        holiday_configs = _rules_for_year(int(theme_data.date[0:4]))  # Each date uses the rules of its own year
+        for (holiday, config) in holiday_configs.items():
             if holiday in theme_data.themes:
                 holiday_themes = holidays.get(theme_data.date) or []
-                holiday_themes.append((holiday, holiday_configs[holiday]))
+                holiday_themes.append((holiday, config))
                 holidays[theme_data.date] = holiday_themes
 
     # TODO: Missing Allhelgonaafton
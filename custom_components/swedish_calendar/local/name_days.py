@@ -1,9 +1,19 @@
+import calendar
+from datetime import date
+from functools import lru_cache
 import json
 import logging
 import os
+import sys
 
 _LOGGER = logging.getLogger(__name__)
 
+# Slot of the first day of each month, the table has a slot for every day of a leap year
+_MONTH_SLOTS = tuple(sum(calendar.monthrange(2000, month)[1] for month in range(1, m)) for m in range(1, 13))
+_LEAP_DAY_SLOT = _MONTH_SLOTS[1] + 28
+_SLOTS_BY_MONTH_AND_DAY = {f'{month:02}-{day:02}': _MONTH_SLOTS[month - 1] + day - 1
+                           for month in range(1, 13) for day in range(1, calendar.monthrange(2000, month)[1] + 1)}
+
 
 class NameDayProvider:
 
@@ -11,25 +21,43 @@ class NameDayProvider:
         pass
 
     def get_names(self, month_and_day: str) -> list[str]:
-        return self._get_name_days().get(month_and_day) or []
-
-    def _get_name_days(self) -> dict[str, list[str]]:
-        if not hasattr(self, 'name_days'):
-            name_days = self.__load_name_days()
-            self.name_days: dict[str, list[str]] = {}
-
-            for month in name_days.keys():
-                for (day, names) in name_days[month].items():
-                    self.name_days[f'{month}-{day}'] = names.split(', ')
-
-        return self.name_days
-
-    @staticmethod
-    def __load_name_days() -> dict[str, dict[str, str]]:
-        try:
-            with open(os.path.join(os.path.dirname(__file__), 'name_days.json')) as f:
-                name_days = json.load(f)
-        except json.JSONDecodeError as err:
-            _LOGGER.error("Invalid json in name days file, %s", err)
-
-        return name_days
+        slot = _SLOTS_BY_MONTH_AND_DAY.get(month_and_day)
+        return list(_name_day_table()[slot]) if slot is not None else []
+
+    def get_names_for_range(self, start: date, end: date) -> list[list[str]]:
+        """Names of every day from start to end, without formatting or parsing any dates."""
+        table = _name_day_table()
+        names = []
+        for year in range(start.year, end.year + 1):
+            first_of_year = date(year, 1, 1).toordinal()
+            first = max(start.toordinal(), first_of_year) - first_of_year
+            last = min(end.toordinal(), date(year, 12, 31).toordinal()) - first_of_year
+            names.extend([list(table[slot]) for slot in _year_slots(calendar.isleap(year))[first:last + 1]])
+
+        return names
+
+
+@lru_cache(maxsize=None)
+def _year_slots(is_leap_year: bool) -> tuple[int, ...]:
+    """Table slot of each day of a year, common years skip the leap day."""
+    return tuple(slot for slot in range(366) if is_leap_year or slot != _LEAP_DAY_SLOT)
+
+
+@lru_cache(maxsize=None)
+def _name_day_table() -> tuple[tuple[str, ...], ...]:
+    """Names of each day of a leap year, parsed once per process and shared by all providers."""
+    slots: list[tuple[str, ...]] = [()] * 366
+    for (month, days) in _load_name_days().items():
+        for (day, names) in days.items():
+            slots[_MONTH_SLOTS[int(month) - 1] + int(day) - 1] = tuple(sys.intern(name) for name in names.split(', '))
+
+    return tuple(slots)
+
+
+def _load_name_days() -> dict[str, dict[str, str]]:
+    try:
+        with open(os.path.join(os.path.dirname(__file__), 'name_days.json')) as f:
+            return json.load(f)
+    except json.JSONDecodeError as err:
+        _LOGGER.error("Invalid json in name days file, %s", err)
+        return {}
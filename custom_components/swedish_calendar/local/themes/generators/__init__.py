@@ -1,5 +1,8 @@
+from array import array
 from datetime import date
 
+from ..rules import ThemeRule
+
 count_descriptors = ['Första', 'Andra', 'Tredje', 'Fjärde', 'Femte', 'Sjätte']
 
 
@@ -15,9 +18,30 @@ class ThemeDateGenerator:
             'description': ''
         }
 
-    def generate(self, config: dict[str, any], year: int) -> date:
-        print(config['description'])
+    def generate(self, config: ThemeRule, year: int) -> date:
+        print(config.theme)
         raise Exception('Not implemented')
 
+    def possible_months(self, config: ThemeRule) -> set[int] | None:
+        """Months of the generated year that the dates of config land in, None if it can be any month or year."""
+        return None
+
+    def generate_bulk(self, configs: list[ThemeRule], years: range) -> array:
+        """Date ordinals of every config in every year, config by config, 0 where a config has no date that year.
+
+        Generators whose dates can be computed with plain arithmetic override this, the default calls generate().
+        """
+        ordinals = array('l')
+        for config in configs:
+            for year in years:
+                date_of_theme = self.generate(config, year)
+                ordinals.append(date_of_theme.toordinal() if date_of_theme is not None else 0)
+        return ordinals
+
     def name(self) -> str:
         raise Exception('No name provided')
+
+
+def first_of_month_ordinals(years: range) -> list[list[int]]:
+    """Ordinal of the first day of each month, indexed by [year - years.start][month - 1]."""
+    return [[date(year, month, 1).toordinal() for month in range(1, 13)] for year in years]
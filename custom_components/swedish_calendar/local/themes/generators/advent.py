@@ -1,5 +1,6 @@
 from datetime import date, timedelta
 
+from ..rules import ThemeRule
 from . import ThemeDateGenerator, count_descriptors
 
 
@@ -28,9 +29,9 @@ class AdventGenerator(ThemeDateGenerator):
 
         return config
 
-    def generate(self, config: dict[str, any], year: int) -> date:
+    def generate(self, config: ThemeRule, year: int) -> date:
         dates = self.__get_advent_dates(year)
-        return dates[config['index']]
+        return dates[config.index]
 
     def name(self) -> str:
         return 'advent'
@@ -1,5 +1,6 @@
 from datetime import date, timedelta
 
+from ..rules import ThemeRule
 from . import ThemeDateGenerator
 
 
@@ -18,7 +19,7 @@ class AllBossesGenerator(ThemeDateGenerator):
     def matches(self, theme: str, dates: [date]) -> bool:
         return len(dates) > 1 and all([d == self.__get_all_bosses_day(d.year) for d in dates])
 
-    def generate(self, config: dict[str, any], year: int) -> date:
+    def generate(self, config: ThemeRule, year: int) -> date:
         return self.__get_all_bosses_day(year)
 
     def name(self) -> str:
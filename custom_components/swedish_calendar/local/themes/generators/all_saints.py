@@ -1,5 +1,6 @@
 from datetime import date, timedelta
 
+from ..rules import ThemeRule
 from . import ThemeDateGenerator, count_descriptors
 from .weekday_after_date import WeekdayAfterDateGenerator
 
@@ -25,9 +26,9 @@ class AllSaintsGenerator(WeekdayAfterDateGenerator):
 
         return config
 
-    def generate(self, config: dict[str, any], year: int) -> date:
+    def generate(self, config: ThemeRule, year: int) -> date:
         dates = self._get_dates(year)
-        return dates[config['index']]
+        return dates[config.index]
 
     def name(self) -> str:
         return 'all_saints'
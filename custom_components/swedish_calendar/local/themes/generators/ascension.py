@@ -1,15 +1,16 @@
-from datetime import date, timedelta
+from datetime import date
 
+from ..rules import ThemeRule
 from . import ThemeDateGenerator, count_descriptors
-from .easter import gauss_easter
+from .easter import easter_dates
 
 
 class AscensionGenerator(ThemeDateGenerator):
+    _OFFSETS = (38, 39)  # Kristi himmelsfärdsdag and the day after
 
     @staticmethod
-    def __get_ascension_dates(year: int) -> [date]:
-        easter_sun = gauss_easter(year)
-        return [easter_sun + timedelta(i) for i in range(38, 40)]
+    def __get_ascension_dates(year: int) -> tuple[date, ...]:
+        return easter_dates(year, AscensionGenerator._OFFSETS)
 
     @staticmethod
     def __is_ascension_day(date_in_month: date) -> bool:
@@ -28,9 +29,9 @@ class AscensionGenerator(ThemeDateGenerator):
 
         return config
 
-    def generate(self, config: dict[str, any], year: int) -> date:
+    def generate(self, config: ThemeRule, year: int) -> date:
         dates = self.__get_ascension_dates(year)
-        return dates[config['index']]
+        return dates[config.index]
 
     def name(self) -> str:
         return 'ascension'
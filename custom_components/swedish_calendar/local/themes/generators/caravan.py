@@ -2,6 +2,7 @@ from datetime import date, timedelta
 
 import ephem
 
+from ..rules import ThemeRule
 from . import ThemeDateGenerator
 from .midsummer import MidsummerGenerator
 
@@ -16,7 +17,7 @@ class CaravanGenerator(ThemeDateGenerator):
     def matches(self, theme: str, dates: [date]) -> bool:
         return len(dates) > 1 and all([d == self._get_date(d.year) for d in dates])
 
-    def generate(self, config: dict[str, any], year: int) -> date:
+    def generate(self, config: ThemeRule, year: int) -> date:
         return self._get_date(year)
 
     def name(self) -> str:
@@ -1,5 +1,6 @@
 from datetime import date
 
+from ..rules import ThemeRule
 from . import ThemeDateGenerator
 from .all_saints import AllSaintsGenerator
 from .holy_mikael import HolyMikaelGenerator
@@ -105,5 +106,5 @@ class DelegatingGenerator(ThemeDateGenerator):
     def generate_config(self, theme: str, dates: [date]) -> dict[str, any]:
         return self.overrides[theme]['generator'].generate_config(theme, self.overrides[theme]['dates'])
 
-    def generate(self, config: dict[str, any], year: int) -> date:
-        return self.overrides[config['theme']]['generator'].generate(config, year)
+    def generate(self, config: ThemeRule, year: int) -> date:
+        return self.overrides[config.theme]['generator'].generate(config, year)
@@ -1,9 +1,12 @@
 from datetime import date, timedelta
+from functools import lru_cache
 import math
 
+from ..rules import ThemeRule
 from . import ThemeDateGenerator, count_descriptors
 
 
+@lru_cache(maxsize=1024)
 def gauss_easter(year: int) -> date:
     a = year % 19
     b = year % 4
@@ -31,12 +34,19 @@ def gauss_easter(year: int) -> date:
             return date(year, 3, days)
 
 
+@lru_cache(maxsize=1024)
+def easter_dates(year: int, offsets: tuple[int, ...]) -> tuple[date, ...]:
+    """Dates at the given day offsets from Easter Sunday, shared by all generators relative to Easter."""
+    easter_sun = gauss_easter(year)
+    return tuple(easter_sun + timedelta(days=offset) for offset in offsets)
+
+
 class EasterGenerator(ThemeDateGenerator):
+    _OFFSETS = (-3, -2, -1, 0, 1)  # Skärtorsdagen to Annandag påsk
 
     @staticmethod
     def __get_easter_dates(year):
-        easter_sun = gauss_easter(year)
-        return [easter_sun - timedelta(i) for i in range(3, -2, -1)]
+        return easter_dates(year, EasterGenerator._OFFSETS)
 
     @staticmethod
     def __is_easter__(date_in_month):
@@ -55,9 +65,9 @@ class EasterGenerator(ThemeDateGenerator):
 
         return config
 
-    def generate(self, config: dict[str, any], year: int) -> date:
+    def generate(self, config: ThemeRule, year: int) -> date:
         dates = self.__get_easter_dates(year)
-        return dates[config['index']]
+        return dates[config.index]
 
     def name(self) -> str:
         return 'easter'
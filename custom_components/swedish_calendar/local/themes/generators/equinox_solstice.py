@@ -1,23 +1,68 @@
 from datetime import date
+from functools import lru_cache
 
-import ephem
-
+from ..rules import ThemeRule
 from . import ThemeDateGenerator
 
+# Day in march, june, september and december of each event, from 1970 to 2100 (generated with ephem, in UTC).
+# Years outside of the table are computed with ephem.
+_TABLE_FIRST_YEAR = 1970
+_TABLE = (
+    (21, 21, 23, 22), (21, 22, 23, 22), (20, 21, 22, 21), (20, 21, 23, 22), (21, 21, 23, 22),  # 1970
+    (21, 22, 23, 22), (20, 21, 22, 21), (20, 21, 23, 21), (20, 21, 23, 22), (21, 21, 23, 22),  # 1975
+    (20, 21, 22, 21), (20, 21, 23, 21), (20, 21, 23, 22), (21, 21, 23, 22), (20, 21, 22, 21),  # 1980
+    (20, 21, 23, 21), (20, 21, 23, 22), (21, 21, 23, 22), (20, 21, 22, 21), (20, 21, 23, 21),  # 1985
+    (20, 21, 23, 22), (21, 21, 23, 22), (20, 21, 22, 21), (20, 21, 23, 21), (20, 21, 23, 22),  # 1990
+    (21, 21, 23, 22), (20, 21, 22, 21), (20, 21, 22, 21), (20, 21, 23, 22), (21, 21, 23, 22),  # 1995
+    (20, 21, 22, 21), (20, 21, 22, 21), (20, 21, 23, 22), (21, 21, 23, 22), (20, 21, 22, 21),  # 2000
+    (20, 21, 22, 21), (20, 21, 23, 22), (21, 21, 23, 22), (20, 20, 22, 21), (20, 21, 22, 21),  # 2005
+    (20, 21, 23, 21), (20, 21, 23, 22), (20, 20, 22, 21), (20, 21, 22, 21), (20, 21, 23, 21),  # 2010
+    (20, 21, 23, 22), (20, 20, 22, 21), (20, 21, 22, 21), (20, 21, 23, 21), (20, 21, 23, 22),  # 2015
+    (20, 20, 22, 21), (20, 21, 22, 21), (20, 21, 23, 21), (20, 21, 23, 22), (20, 20, 22, 21),  # 2020
+    (20, 21, 22, 21), (20, 21, 23, 21), (20, 21, 23, 22), (20, 20, 22, 21), (20, 21, 22, 21),  # 2025
+    (20, 21, 22, 21), (20, 21, 23, 22), (20, 20, 22, 21), (20, 21, 22, 21), (20, 21, 22, 21),  # 2030
+    (20, 21, 23, 22), (20, 20, 22, 21), (20, 21, 22, 21), (20, 21, 22, 21), (20, 21, 23, 22),  # 2035
+    (20, 20, 22, 21), (20, 20, 22, 21), (20, 21, 22, 21), (20, 21, 23, 22), (19, 20, 22, 21),  # 2040
+    (20, 20, 22, 21), (20, 21, 22, 21), (20, 21, 23, 21), (19, 20, 22, 21), (20, 20, 22, 21),  # 2045
+    (20, 21, 22, 21), (20, 21, 23, 21), (19, 20, 22, 21), (20, 20, 22, 21), (20, 21, 22, 21),  # 2050
+    (20, 21, 23, 21), (19, 20, 22, 21), (20, 20, 22, 21), (20, 21, 22, 21), (20, 21, 23, 21),  # 2055
+    (19, 20, 22, 21), (20, 20, 22, 21), (20, 21, 22, 21), (20, 21, 22, 21), (19, 20, 22, 21),  # 2060
+    (20, 20, 22, 21), (20, 21, 22, 21), (20, 21, 22, 21), (19, 20, 22, 21), (20, 20, 22, 21),  # 2065
+    (20, 20, 22, 21), (20, 21, 22, 21), (19, 20, 22, 21), (20, 20, 22, 21), (20, 20, 22, 21),  # 2070
+    (20, 21, 22, 21), (19, 20, 22, 21), (19, 20, 22, 21), (20, 20, 22, 21), (20, 21, 22, 21),  # 2075
+    (19, 20, 22, 20), (19, 20, 22, 21), (20, 20, 22, 21), (20, 21, 22, 21), (19, 20, 22, 20),  # 2080
+    (19, 20, 22, 21), (20, 20, 22, 21), (20, 21, 22, 21), (19, 20, 22, 20), (19, 20, 22, 21),  # 2085
+    (20, 20, 22, 21), (20, 21, 22, 21), (19, 20, 21, 20), (19, 20, 22, 21), (20, 20, 22, 21),  # 2090
+    (20, 21, 22, 21), (19, 20, 21, 20), (19, 20, 22, 21), (20, 20, 22, 21), (20, 20, 22, 21),  # 2095
+    (20, 21, 22, 21),  # 2100
+)
+_MONTHS = (3, 6, 9, 12)
+
+
+@lru_cache(maxsize=256)
+def _get_dates(year: int) -> tuple[date, ...]:
+    """Dates of the four events in year, shared by all equinox/solstice configs."""
+    if _TABLE_FIRST_YEAR <= year < _TABLE_FIRST_YEAR + len(_TABLE):
+        return tuple(date(year, month, day) for (month, day) in zip(_MONTHS, _TABLE[year - _TABLE_FIRST_YEAR]))
+
+    import ephem  # Only needed outside of the table, and slow to import
+
+    start_of_year = date(year, 1, 1)
+    return (
+        ephem.next_vernal_equinox(start_of_year).datetime().date(),
+        ephem.next_summer_solstice(start_of_year).datetime().date(),
+        ephem.next_autumnal_equinox(start_of_year).datetime().date(),
+        ephem.next_winter_solstice(start_of_year).datetime().date()
+    )
+
 
 class EquinoxSolsticeGenerator(ThemeDateGenerator):
     def __init__(self):
         self.event_types = ['Vårdagjämning', 'Sommarsolstånd', 'Höstdagjämning', 'Vintersolstånd']
 
     @staticmethod
-    def __get_dates(year: int) -> [date]:
-        start_of_year = date(year, 1, 1)
-        return [
-            ephem.next_vernal_equinox(start_of_year).datetime().date(),
-            ephem.next_summer_solstice(start_of_year).datetime().date(),
-            ephem.next_autumnal_equinox(start_of_year).datetime().date(),
-            ephem.next_winter_solstice(start_of_year).datetime().date()
-        ]
+    def __get_dates(year: int) -> tuple[date, ...]:
+        return _get_dates(year)
 
     def __matches(self, date_in_month: date) -> bool:
         return date_in_month in self.__get_dates(date_in_month.year)
@@ -35,9 +80,9 @@ class EquinoxSolsticeGenerator(ThemeDateGenerator):
 
         return config
 
-    def generate(self, config: dict[str, any], year: int) -> date:
+    def generate(self, config: ThemeRule, year: int) -> date:
         dates = self.__get_dates(year)
-        return dates[config['index']]
+        return dates[config.index]
 
     def name(self) -> str:
         return 'equinox_solstice'
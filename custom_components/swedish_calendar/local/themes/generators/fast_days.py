@@ -1,15 +1,16 @@
-from datetime import date, timedelta
+from datetime import date
 
+from ..rules import ThemeRule
 from . import ThemeDateGenerator, count_descriptors
-from .easter import gauss_easter
+from .easter import easter_dates
 
 
 class FastDaysGenerator(ThemeDateGenerator):
+    _OFFSETS = (-49, -48, -47, -46)  # Fastlagssöndagen to Askonsdagen
 
     @staticmethod
-    def __get_fast_dates(year: int) -> [date]:
-        easter_sun = gauss_easter(year)
-        return [easter_sun - timedelta(i) for i in range(49, 45, -1)]
+    def __get_fast_dates(year: int) -> tuple[date, ...]:
+        return easter_dates(year, FastDaysGenerator._OFFSETS)
 
     @staticmethod
     def __is_fast_day(date_in_month: date) -> bool:
@@ -28,9 +29,9 @@ class FastDaysGenerator(ThemeDateGenerator):
 
         return config
 
-    def generate(self, config: dict[str, any], year: int) -> date:
+    def generate(self, config: ThemeRule, year: int) -> date:
         dates = self.__get_fast_dates(year)
-        return dates[config['index']]
+        return dates[config.index]
 
     def name(self) -> str:
         return 'fast_days'
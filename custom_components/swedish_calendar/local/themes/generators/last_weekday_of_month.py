@@ -1,5 +1,6 @@
 from datetime import date, timedelta
 
+from ..rules import ThemeRule
 from . import ThemeDateGenerator
 
 
@@ -25,10 +26,13 @@ class LastWeekdayOfMonthGenerator(ThemeDateGenerator):
 
         return config
 
-    def generate(self, config: dict[str, any], year: int) -> date:
-        start = date(year, config['month'], 1)
-        next_month = date(year, config['month']+1, 1)
-        diff_to_first = (config['weekday'] - start.isoweekday()) % 7
+    def possible_months(self, config: ThemeRule) -> set[int] | None:
+        return {config.month}
+
+    def generate(self, config: ThemeRule, year: int) -> date:
+        start = date(year, config.month, 1)
+        next_month = date(year, config.month+1, 1)
+        diff_to_first = (config.weekday - start.isoweekday()) % 7
         first = start + timedelta(days=diff_to_first)
         days_to_last_in_month = (next_month-first).days - 1
 
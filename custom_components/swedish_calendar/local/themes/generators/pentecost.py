@@ -1,15 +1,16 @@
-from datetime import date, timedelta
+from datetime import date
 
+from ..rules import ThemeRule
 from . import ThemeDateGenerator, count_descriptors
-from .easter import gauss_easter
+from .easter import easter_dates
 
 
 class PentecostGenerator(ThemeDateGenerator):
+    _OFFSETS = (48, 49, 50)  # Pingstafton to Annandag pingst
 
     @staticmethod
-    def __get_pentecost_dates(year: int) -> [date]:
-        easter_sun = gauss_easter(year)
-        return [easter_sun + timedelta(i) for i in range(48, 51)]
+    def __get_pentecost_dates(year: int) -> tuple[date, ...]:
+        return easter_dates(year, PentecostGenerator._OFFSETS)
 
     @staticmethod
     def __is_pentecost_day(date_in_month: date) -> bool:
@@ -28,9 +29,9 @@ class PentecostGenerator(ThemeDateGenerator):
 
         return config
 
-    def generate(self, config: dict[str, any], year: int) -> date:
+    def generate(self, config: ThemeRule, year: int) -> date:
         dates = self.__get_pentecost_dates(year)
-        return dates[config['index']]
+        return dates[config.index]
 
     def name(self) -> str:
         return 'pentecost'
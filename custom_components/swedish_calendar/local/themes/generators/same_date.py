@@ -1,6 +1,8 @@
+from array import array
 from datetime import date
 
-from . import ThemeDateGenerator
+from ..rules import ThemeRule
+from . import ThemeDateGenerator, first_of_month_ordinals
 
 
 class SameDateGenerator(ThemeDateGenerator):
@@ -15,8 +17,22 @@ class SameDateGenerator(ThemeDateGenerator):
 
         return config
 
-    def generate(self, config: dict[str, any], year: int) -> date:
-        return date(year, config['month'], config['day'])
+    def possible_months(self, config: ThemeRule) -> set[int] | None:
+        return {config.month}
+
+    def generate(self, config: ThemeRule, year: int) -> date:
+        return date(year, config.month, config.day)
+
+    def generate_bulk(self, configs: list[ThemeRule], years: range) -> array:
+        month_starts = first_of_month_ordinals(years)
+        ordinals = array('l')
+        for config in configs:
+            month, day = config.month, config.day
+            if month == 2 and day == 29:
+                ordinals.extend(starts[1] + 28 if (starts[2] - starts[1]) == 29 else 0 for starts in month_starts)
+            else:
+                ordinals.extend(starts[month - 1] + day - 1 for starts in month_starts)
+        return ordinals
 
     def name(self) -> str:
         return 'same_date'
@@ -1,5 +1,6 @@
 from datetime import date, timedelta
 
+from ..rules import ThemeRule
 from . import ThemeDateGenerator
 from .all_saints import AllSaintsGenerator
 
@@ -13,7 +14,7 @@ class StockfishGenerator(ThemeDateGenerator):
     def matches(self, theme: str, dates: [date]) -> bool:
         return len(dates) > 1 and all([d == self._stockfish_day(d.year) for d in dates])
 
-    def generate(self, config: dict[str, any], year: int) -> date:
+    def generate(self, config: ThemeRule, year: int) -> date:
         return self._stockfish_day(year)
 
     def name(self) -> str:
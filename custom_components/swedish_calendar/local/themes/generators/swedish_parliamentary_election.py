@@ -1,5 +1,6 @@
 from datetime import date
 
+from ..rules import ThemeRule
 from .weekday_after_date import WeekdayAfterDateGenerator
 
 
@@ -10,7 +11,7 @@ class SwedishParliamentaryElectionGenerator(WeekdayAfterDateGenerator):
     @staticmethod
     def _is_election_year(year: int) -> bool:
         if year < 1970:
-            raise Exception("Not implemented")
+            return False  # Not implemented, but january 1970 also asks for the dates of 1969
         mod_year = 3 if year < 1994 else 4
         return year % mod_year == 2
 
@@ -23,7 +24,7 @@ class SwedishParliamentaryElectionGenerator(WeekdayAfterDateGenerator):
 
         return config
 
-    def generate(self, config: dict[str, any], year: int) -> date:
+    def generate(self, config: ThemeRule, year: int) -> date:
         return super().generate(config, year) if self._is_election_year(year) else None
 
     def name(self) -> str:
@@ -1,5 +1,6 @@
 from datetime import date, timedelta
 
+from ..rules import ThemeRule
 from . import ThemeDateGenerator
 
 
@@ -29,12 +30,12 @@ class WeekdayOfLastFullWeekInMonthGenerator(ThemeDateGenerator):
 
         return config
 
-    def generate(self, config: dict[str, any], year: int) -> date:
-        last_day_in_month = date(year, config['month']+1, 1) - timedelta(days=1)
+    def generate(self, config: ThemeRule, year: int) -> date:
+        last_day_in_month = date(year, config.month+1, 1) - timedelta(days=1)
         if last_day_in_month.isoweekday() == 7:  # Is full week
-            days_diff = 7 - config['weekday']
+            days_diff = 7 - config.weekday
         else:
-            days_diff = (last_day_in_month.isoweekday() - config['weekday']) % 7 + 7
+            days_diff = (last_day_in_month.isoweekday() - config.weekday) % 7 + 7
         return last_day_in_month - timedelta(days=days_diff)
 
     def name(self) -> str:
@@ -1,5 +1,6 @@
 from datetime import date, timedelta
 
+from ..rules import ThemeRule
 from . import ThemeDateGenerator
 
 
@@ -22,10 +23,10 @@ class WeekdayOfXthWeekGenerator(ThemeDateGenerator):
 
         return config
 
-    def generate(self, config: dict[str, any], year: int) -> date:
+    def generate(self, config: ThemeRule, year: int) -> date:
         # TODO
         jan_first = date(year, 1, 1)
-        next_correct_weekday_diff = (config['weekday']-jan_first.isoweekday()) % 7
+        next_correct_weekday_diff = (config.weekday-jan_first.isoweekday()) % 7
         print(next_correct_weekday_diff)
         next_correct_weekday = jan_first + timedelta(days=next_correct_weekday_diff)
         #while next_correct_weekday.isocalendar().week != 1:
@@ -33,7 +34,7 @@ class WeekdayOfXthWeekGenerator(ThemeDateGenerator):
 
         print(next_correct_weekday)
         print(next_correct_weekday.isocalendar().week)
-        week_diff = config['week'] - next_correct_weekday.isocalendar().week
+        week_diff = config.week - next_correct_weekday.isocalendar().week
         print(week_diff)
 
         next_date = jan_first + timedelta(days=next_correct_weekday_diff + week_diff*7)
@@ -1,5 +1,6 @@
 from datetime import date, timedelta
 
+from ..rules import ThemeRule
 from . import ThemeDateGenerator
 
 
@@ -26,8 +27,8 @@ class XthDayOfYearGenerator(ThemeDateGenerator):
 
         return config
 
-    def generate(self, config: dict[str, any], year: int) -> date:
-        return date(year - 1, 12, 31) + timedelta(days=config['day'])
+    def generate(self, config: ThemeRule, year: int) -> date:
+        return date(year - 1, 12, 31) + timedelta(days=config.day)
 
     def name(self) -> str:
         return 'xth_day_of_year'
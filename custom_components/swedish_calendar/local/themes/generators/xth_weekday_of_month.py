@@ -1,6 +1,8 @@
+from array import array
 from datetime import date, timedelta
 
-from . import ThemeDateGenerator, count_descriptors
+from ..rules import ThemeRule
+from . import ThemeDateGenerator, count_descriptors, first_of_month_ordinals
 
 
 class XthWeekdayOfMonthGenerator(ThemeDateGenerator):
@@ -28,12 +30,26 @@ class XthWeekdayOfMonthGenerator(ThemeDateGenerator):
 
         return config
 
-    def generate(self, config: dict[str, any], year: int) -> date:
-        start = date(year, config['month'], 1)
-        diff_to_first = (config['weekday'] - start.isoweekday()) % 7
-        diff_to_wanted_date = (config['xth'] - 1) * 7 + diff_to_first
+    def possible_months(self, config: ThemeRule) -> set[int] | None:
+        return {config.month} if config.xth <= 4 else None  # A fifth weekday can spill over
+
+    def generate(self, config: ThemeRule, year: int) -> date:
+        start = date(year, config.month, 1)
+        diff_to_first = (config.weekday - start.isoweekday()) % 7
+        diff_to_wanted_date = (config.xth - 1) * 7 + diff_to_first
 
         return start + timedelta(days=diff_to_wanted_date)
 
+    def generate_bulk(self, configs: list[ThemeRule], years: range) -> array:
+        month_starts = first_of_month_ordinals(years)
+        ordinals = array('l')
+        for config in configs:
+            month, weekday, weeks = config.month, config.weekday, (config.xth - 1) * 7
+            for starts in month_starts:
+                start = starts[month - 1]
+                # Ordinal 1 is a monday, so (ordinal - 1) % 7 + 1 is the isoweekday
+                ordinals.append(start + weeks + (weekday - ((start - 1) % 7 + 1)) % 7)
+        return ordinals
+
     def name(self) -> str:
         return 'xth_weekday_of_month'
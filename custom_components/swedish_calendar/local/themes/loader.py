@@ -1,12 +1,19 @@
 import json
 import logging
+import marshal
 import os
+import sys
 
 from homeassistant.components import persistent_notification
 from homeassistant.core import HomeAssistant
 
+from .rules import ThemeRule
+
 _LOGGER = logging.getLogger(__name__)
 CUSTOM_DATA_DIRECTORY = "swedish_calendar/themes"
+COMPILED_RULES_FILE = "swedish_calendar/theme_rules.cache"
+# The marshal format can change between python versions
+_COMPILED_RULES_VERSION = (3, *sys.version_info[:2])
 
 
 class ThemeConfigLoader:
@@ -14,24 +21,110 @@ class ThemeConfigLoader:
     def __init__(self, hass: HomeAssistant):
         self.hass = hass
         self._configs = None
+        self._sources: dict[str, tuple[tuple[int, int], list[ThemeRule]]] = {}  # path -> ((mtime_ns, size), rules)
+        self._broken_sources: set[str] = set()
+        self.generation = 0  # Increased on every (re)load, so that users can tell when configs changed
 
-    def get_configs(self, reload=False) -> list:
+    def get_configs(self, reload=False) -> list[ThemeRule]:
         if self._configs is None or reload:
-            self._configs = self._load_configs()
+            self._set_sources(self._load_sources())
 
         return self._configs
 
-    def _load_configs(self) -> list:
-        configs = self._load_static_configs()
-        configs.extend(self._load_custom_configs())
-
-        return configs
-
-    def _load_static_configs(self) -> list:
-        return self._load_json(os.path.join(os.path.dirname(__file__), 'theme_days_config.json'))
-
-    def _load_custom_configs(self) -> list:
-        configs = []
+    def reload_changed(self) -> list[ThemeRule] | None:
+        """Reload the custom theme files that were added, changed or removed since they were loaded.
+
+        Files are compared by mtime and size. Returns the rules of the files before and after the reload, or None
+        if no file changed.
+        """
+        if self._configs is None:
+            self.get_configs()
+            return None
+
+        static_path = self._static_config_path()
+        stamps = self._stamps([static_path] + self._custom_config_paths())
+        changed_paths = [path for (path, stamp) in stamps.items()
+                         if path != static_path and (path not in self._sources or self._sources[path][0] != stamp)]
+        removed_paths = [path for path in self._sources if path not in stamps]
+        if not changed_paths and not removed_paths:
+            return None
+
+        affected_rules = [rule for path in changed_paths + removed_paths if path in self._sources
+                          for rule in self._sources[path][1]]
+        self._broken_sources.difference_update(changed_paths + removed_paths)
+        reloaded = {path: (stamps[path], self._load_source(path)) for path in changed_paths}
+        for (_, rules) in reloaded.values():
+            affected_rules.extend(rules)
+
+        _LOGGER.info(f'Reloaded {len(changed_paths)} changed and dropped {len(removed_paths)} removed custom '
+                     f'theme files')
+        # Keep the order of a full load, so that themes on the same day are listed the same way after a restart
+        sources = {path: reloaded.get(path) or self._sources[path] for path in stamps}
+        self._set_sources(sources)
+        self._write_compiled_rules(sources)
+        return affected_rules
+
+    def _set_sources(self, sources: dict[str, tuple[tuple[int, int], list[ThemeRule]]]) -> None:
+        self._sources = sources
+        self._configs = [rule for (_, rules) in sources.values() for rule in rules]
+        self.generation += 1
+
+    def _load_sources(self) -> dict[str, tuple[tuple[int, int], list[ThemeRule]]]:
+        """Load the compiled rules if no source changed since they were compiled, otherwise compile the sources."""
+        stamps = self._stamps([self._static_config_path()] + self._custom_config_paths())
+
+        sources = self._read_compiled_rules(stamps)
+        if sources is not None:
+            _LOGGER.debug(f'Loaded compiled theme rules of {len(sources)} files')
+            return sources
+
+        self._broken_sources = set()
+        sources = {path: (stamp, self._load_source(path)) for (path, stamp) in stamps.items()}
+        self._write_compiled_rules(sources)
+        return sources
+
+    def _load_source(self, path: str) -> list[ThemeRule]:
+        is_custom = path != self._static_config_path()
+        configs = self._load_json(path, notify_user_on_error=is_custom)
+        if configs is None:
+            self._broken_sources.add(path)
+
+        rules = self._compile(configs if configs is not None else [], path)
+        if is_custom:
+            _LOGGER.info(f'Loaded {len(rules)} custom themes from {path}')
+        return rules
+
+    @staticmethod
+    def _stamps(paths: list[str]) -> dict[str, tuple[int, int]]:
+        stamps = {}
+        for path in paths:
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue  # Removed after the directory was listed
+            stamps[path] = (stat.st_mtime_ns, stat.st_size)
+        return stamps
+
+    @staticmethod
+    def _compile(configs: list, path: str) -> list[ThemeRule]:
+        if not isinstance(configs, list):
+            _LOGGER.warning(f'Skipping theme configs in {path}, expected a list of configs')
+            return []
+
+        rules = []
+        for config in configs:
+            try:
+                rules.append(ThemeRule.from_config(config))
+            except ValueError as err:
+                _LOGGER.warning(f'Skipping invalid theme config in {path}: {err}')
+        return rules
+
+    @staticmethod
+    def _static_config_path() -> str:
+        return os.path.join(os.path.dirname(__file__), 'theme_days_config.json')
+
+    def _custom_config_paths(self) -> list[str]:
+        paths = []
         data_dir = os.path.join(self.hass.config.config_dir, CUSTOM_DATA_DIRECTORY)
 
         if os.path.exists(data_dir):
@@ -40,16 +133,43 @@ class ThemeConfigLoader:
             for root, _, files in os.walk(data_dir, topdown=False):
                 for file_name in files:
                     if file_name.endswith('.json'):
-                        custom_themes_path = os.path.join(root, file_name)
-                        custom_themes = self._load_json(custom_themes_path, notify_user_on_error=True)
+                        paths.append(os.path.join(root, file_name))
+        return paths
 
-                        _LOGGER.info(f'Loaded {len(custom_themes)} custom themes from {custom_themes_path}')
-
-                        configs.extend(custom_themes)
-        return configs
+    def _read_compiled_rules(
+            self, stamps: dict[str, tuple[int, int]]) -> dict[str, tuple[tuple[int, int], list[ThemeRule]]] | None:
+        try:
+            with open(os.path.join(self.hass.config.config_dir, COMPILED_RULES_FILE), 'rb') as f:
+                compiled = marshal.loads(f.read())
+        except (OSError, EOFError, ValueError, TypeError):
+            return None
+
+        if not isinstance(compiled, dict) or compiled.get('version') != _COMPILED_RULES_VERSION or \
+                compiled.get('sources') != [(path, *stamp) for (path, stamp) in stamps.items()]:
+            return None
+        return {path: (stamps[path], [ThemeRule._make(rule) for rule in rules])
+                for ((path, _, _), rules) in zip(compiled['sources'], compiled['rules'])}
+
+    def _write_compiled_rules(self, sources: dict[str, tuple[tuple[int, int], list[ThemeRule]]]) -> None:
+        path = os.path.join(self.hass.config.config_dir, COMPILED_RULES_FILE)
+        if self._broken_sources or not os.path.isdir(self.hass.config.config_dir):
+            # Broken files are read again on next start, so that they are reported again. There is no config
+            # directory when running outside of Home Assistant.
+            return
 
-    def _load_json(self, path: str, notify_user_on_error=False) -> list:
-        configs = []
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(f'{path}.tmp', 'wb') as f:
+                # Rules are stored as plain tuples, marshal reads those back faster than pickle or json
+                marshal.dump({'version': _COMPILED_RULES_VERSION,
+                              'sources': [(source, *stamp) for (source, (stamp, _)) in sources.items()],
+                              'rules': [[tuple(rule) for rule in rules] for (_, rules) in sources.values()]}, f)
+            os.replace(f'{path}.tmp', path)
+        except OSError as err:
+            _LOGGER.debug(f'Could not write compiled theme rules to {path}, {err}')
+
+    def _load_json(self, path: str, notify_user_on_error=False) -> list | None:
+        configs = None
         try:
             with open(path, encoding='iso-8859-1') as f:
                 configs = json.load(f)
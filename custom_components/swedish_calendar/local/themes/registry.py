@@ -0,0 +1,63 @@
+import importlib
+import logging
+import threading
+
+from custom_components.swedish_calendar.local.themes import generators
+from custom_components.swedish_calendar.local.themes.generators import (
+    ThemeDateGenerator,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+# Generator name -> class name, every generator lives in the module of the same name in generators
+_GENERATOR_CLASSES = {
+    'advent': 'AdventGenerator',
+    'all_bosses': 'AllBossesGenerator',
+    'all_saints': 'AllSaintsGenerator',
+    'ascension': 'AscensionGenerator',
+    'bacon': 'BaconGenerator',
+    'caravan': 'CaravanGenerator',
+    'easter': 'EasterGenerator',
+    'equinox_solstice': 'EquinoxSolsticeGenerator',
+    'fast_days': 'FastDaysGenerator',
+    'funeral_greeting': 'FuneralGreetingGenerator',
+    'grandparents': 'GrandparentsGenerator',
+    'grill': 'GrillGenerator',
+    'holy_mikael': 'HolyMikaelGenerator',
+    'last_weekday_of_month': 'LastWeekdayOfMonthGenerator',
+    'midsummer': 'MidsummerGenerator',
+    'national_o': 'NationalOGenerator',
+    'nettle': 'NettleGenerator',
+    'news_deliverer': 'NewsDelivererGenerator',
+    'pentecost': 'PentecostGenerator',
+    'safer_internet': 'SaferInternetGenerator',
+    'same_date': 'SameDateGenerator',
+    'start_of_lobster_fishing': 'StartOfLobsterFishingGenerator',
+    'stockfish': 'StockfishGenerator',
+    'swedish_parliamentary_election': 'SwedishParliamentaryElectionGenerator',
+    'thanksgiving': 'ThanksGivingGenerator',
+    'weekday_of_last_full_week_in_month': 'WeekdayOfLastFullWeekInMonthGenerator',
+    'weekday_of_xth_week': 'WeekdayOfXthWeekGenerator',
+    'xth_day_of_year': 'XthDayOfYearGenerator',
+    'xth_weekday_of_month': 'XthWeekdayOfMonthGenerator',
+}
+
+
+class GeneratorRegistry:
+    """Generators by name, a generator module is imported the first time a config references it."""
+
+    def __init__(self):
+        self._generators: dict[str, ThemeDateGenerator] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> ThemeDateGenerator | None:
+        generator = self._generators.get(name)
+        if generator is None and name in _GENERATOR_CLASSES:
+            with self._lock:
+                if name not in self._generators:
+                    module = importlib.import_module(f'{generators.__name__}.{name}')
+                    self._generators[name] = getattr(module, _GENERATOR_CLASSES[name])()
+                    _LOGGER.debug("Loaded generator %s", name)
+                generator = self._generators[name]
+
+        return generator
@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import calendar
+from typing import Any, NamedTuple
+
+# Fields that each generator reads, with their valid (inclusive) range
+_GENERATOR_FIELDS: dict[str, dict[str, tuple[int, int]]] = {
+    'advent': {'index': (0, 3)},
+    'all_saints': {'index': (0, 1)},
+    'ascension': {'index': (0, 1)},
+    'easter': {'index': (0, 4)},
+    'equinox_solstice': {'index': (0, 3)},
+    'fast_days': {'index': (0, 3)},
+    'midsummer': {'index': (0, 1)},
+    'pentecost': {'index': (0, 2)},
+    'thanksgiving': {'index': (0, 3)},
+    'same_date': {'month': (1, 12), 'day': (1, 31)},
+    'xth_weekday_of_month': {'month': (1, 12), 'weekday': (1, 7), 'xth': (1, 5)},
+    # Both generators look at the month after, which is not supported for december
+    'last_weekday_of_month': {'month': (1, 11), 'weekday': (1, 7)},
+    'weekday_of_last_full_week_in_month': {'month': (1, 11), 'weekday': (1, 7)},
+    'weekday_of_xth_week': {'week': (1, 53), 'weekday': (1, 7)},
+    'xth_day_of_year': {'day': (1, 366)},
+}
+
+
+class ThemeRule(NamedTuple):
+    """A validated theme config, generators read their parameters as attributes."""
+
+    theme: str
+    generator: str
+    index: int | None = None
+    month: int | None = None
+    day: int | None = None
+    weekday: int | None = None
+    xth: int | None = None
+    week: int | None = None
+
+    @staticmethod
+    def from_config(config: dict[str, Any]) -> ThemeRule:
+        """Validate a theme config, raises ValueError if it can not be used by its generator."""
+        if not isinstance(config, dict):
+            raise ValueError(f'{config} is not an object')
+        for key in ('theme', 'generator'):
+            if not isinstance(config.get(key), str):
+                raise ValueError(f'{config} is missing {key}')
+
+        fields = {}
+        for (field, (low, high)) in _GENERATOR_FIELDS.get(config['generator'], {}).items():
+            value = config.get(field)
+            if not isinstance(value, int) or isinstance(value, bool) or not low <= value <= high:
+                raise ValueError(f'{config} needs {field} between {low} and {high}')
+            fields[field] = value
+
+        if 'month' in fields and 'day' in fields:
+            # 2000 is a leap year, so 29 February is valid
+            days_in_month = calendar.monthrange(2000, fields['month'])[1]
+            if fields['day'] > days_in_month:
+                raise ValueError(f'{config} needs day between 1 and {days_in_month}')
+
+        return ThemeRule(config['theme'], config['generator'], **fields)
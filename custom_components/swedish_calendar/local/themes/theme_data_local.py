@@ -1,113 +1,37 @@
+from __future__ import annotations
+
+import bisect
+from collections.abc import Iterator
 from datetime import date
 from functools import partial
 import json
 import logging
 import os
 import threading
+import time
 
 from custom_components.swedish_calendar.local.themes.generators import (
     ThemeDateGenerator,
 )
-from custom_components.swedish_calendar.local.themes.generators.advent import (
-    AdventGenerator,
-)
-from custom_components.swedish_calendar.local.themes.generators.all_bosses import (
-    AllBossesGenerator,
-)
-from custom_components.swedish_calendar.local.themes.generators.all_saints import (
-    AllSaintsGenerator,
-)
-from custom_components.swedish_calendar.local.themes.generators.ascension import (
-    AscensionGenerator,
-)
-from custom_components.swedish_calendar.local.themes.generators.bacon import (
-    BaconGenerator,
-)
-from custom_components.swedish_calendar.local.themes.generators.caravan import (
-    CaravanGenerator,
-)
-from custom_components.swedish_calendar.local.themes.generators.easter import (
-    EasterGenerator,
-)
-from custom_components.swedish_calendar.local.themes.generators.equinox_solstice import (
-    EquinoxSolsticeGenerator,
-)
-from custom_components.swedish_calendar.local.themes.generators.fast_days import (
-    FastDaysGenerator,
-)
-from custom_components.swedish_calendar.local.themes.generators.funeral_greeting import (
-    FuneralGreetingGenerator,
-)
-from custom_components.swedish_calendar.local.themes.generators.grandparents import (
-    GrandparentsGenerator,
-)
-from custom_components.swedish_calendar.local.themes.generators.grill import (
-    GrillGenerator,
-)
-from custom_components.swedish_calendar.local.themes.generators.holy_mikael import (
-    HolyMikaelGenerator,
-)
-from custom_components.swedish_calendar.local.themes.generators.last_weekday_of_month import (
-    LastWeekdayOfMonthGenerator,
-)
-from custom_components.swedish_calendar.local.themes.generators.midsummer import (
-    MidsummerGenerator,
-)
-from custom_components.swedish_calendar.local.themes.generators.national_o import (
-    NationalOGenerator,
-)
-from custom_components.swedish_calendar.local.themes.generators.nettle import (
-    NettleGenerator,
-)
-from custom_components.swedish_calendar.local.themes.generators.news_deliverer import (
-    NewsDelivererGenerator,
-)
-from custom_components.swedish_calendar.local.themes.generators.pentecost import (
-    PentecostGenerator,
-)
-from custom_components.swedish_calendar.local.themes.generators.safer_internet import (
-    SaferInternetGenerator,
-)
-from custom_components.swedish_calendar.local.themes.generators.same_date import (
-    SameDateGenerator,
-)
-from custom_components.swedish_calendar.local.themes.generators.start_of_lobster_fishing import (
-    StartOfLobsterFishingGenerator,
-)
-from custom_components.swedish_calendar.local.themes.generators.stockfish import (
-    StockfishGenerator,
-)
-from custom_components.swedish_calendar.local.themes.generators.swedish_parliamentary_election import (
-    SwedishParliamentaryElectionGenerator,
-)
-from custom_components.swedish_calendar.local.themes.generators.thanksgiving import (
-    ThanksGivingGenerator,
-)
-from custom_components.swedish_calendar.local.themes.generators.weekday_of_last_full_week_in_month import (
-    WeekdayOfLastFullWeekInMonthGenerator,
-)
-from custom_components.swedish_calendar.local.themes.generators.weekday_of_xth_week import (
-    WeekdayOfXthWeekGenerator,
-)
-from custom_components.swedish_calendar.local.themes.generators.xth_day_of_year import (
-    XthDayOfYearGenerator,
-)
-from custom_components.swedish_calendar.local.themes.generators.xth_weekday_of_month import (
-    XthWeekdayOfMonthGenerator,
-)
 from custom_components.swedish_calendar.local.themes.loader import ThemeConfigLoader
+from custom_components.swedish_calendar.local.themes.registry import GeneratorRegistry
+from custom_components.swedish_calendar.local.themes.rules import ThemeRule
 from custom_components.swedish_calendar.types import ThemeData
+from custom_components.swedish_calendar.utils import DateUtils, LruCache
 
 _LOGGER = logging.getLogger(__name__)
 
+_MEMO_MONTHS = 16 * 12  # Months of generated themes kept in memory
+_MEMO_YEARS = 16  # Years of generated themes kept in memory, for configs without a fixed month
+
 
 class LocalThemeDataUpdater:
 
     def can_update(self) -> bool:
         return False
 
-    def update(self):
-        pass
+    async def update(self) -> bool:
+        return False
 
 
 class LocalThemeDataProvider:
@@ -126,68 +50,213 @@ class LocalThemeDataProvider:
             self._initialized = True
             self.hass = hass
             self.config_loader = ThemeConfigLoader(hass)
-            self.generators: [ThemeDateGenerator] = [EasterGenerator(),
-                                                     FastDaysGenerator(),
-                                                     AdventGenerator(),
-                                                     AscensionGenerator(),
-                                                     PentecostGenerator(),
-                                                     EquinoxSolsticeGenerator(),
-                                                     MidsummerGenerator(),
-                                                     AllSaintsGenerator(),
-                                                     LastWeekdayOfMonthGenerator(),
-                                                     WeekdayOfLastFullWeekInMonthGenerator(),
-                                                     XthWeekdayOfMonthGenerator(),
-                                                     WeekdayOfXthWeekGenerator(),
-                                                     SameDateGenerator(),
-                                                     NettleGenerator(),
-                                                     HolyMikaelGenerator(),
-                                                     ThanksGivingGenerator(),
-                                                     AllBossesGenerator(),
-                                                     StockfishGenerator(),
-                                                     FuneralGreetingGenerator(),
-                                                     NationalOGenerator(),
-                                                     StartOfLobsterFishingGenerator(),
-                                                     SwedishParliamentaryElectionGenerator(),
-                                                     NewsDelivererGenerator(),
-                                                     GrillGenerator(),
-                                                     BaconGenerator(),
-                                                     CaravanGenerator(),
-                                                     GrandparentsGenerator(),
-                                                     SaferInternetGenerator(),
-                                                     XthDayOfYearGenerator()
-                                                     ]
-            self.generator_config = {generator.name(): generator for generator in self.generators}
+            self.generators = GeneratorRegistry()  # Generators are only loaded when a config uses them
+            self._months = LruCache(_MEMO_MONTHS)  # (year, month) -> themes of that month sorted by date
+            self._floating_years = LruCache(_MEMO_YEARS)  # year -> dates of configs without a fixed month
+            self._memo_generation = self.config_loader.generation
+            self._memo_lock = threading.Lock()
+            self._config_index: ConfigIndex | None = None
 
     async def fetch_data(self, start: date, end: date) -> list[ThemeData]:
-        return await self.hass.async_add_executor_job(partial(self._fetch_data, start=start, end=end))
+        return await self.hass.async_add_executor_job(partial(self.get_themes, start=start, end=end))
 
-    def _fetch_data(self, start: date, end: date) -> list[ThemeData]:
-        years = list(range(min(start.year, end.year), max(start.year, end.year) + 1))
-        all_themes = self.__get_theme_days(years)
-        themes = []
+    def invalidate(self) -> None:
+        """Reload the theme configs, themes are generated again on next fetch."""
+        with self._memo_lock:
+            self.config_loader.get_configs(reload=True)
 
-        for (theme_date, special_themes) in all_themes.items():
-            iso_date_str = theme_date.strftime('%Y-%m-%d')
-            themes.append(ThemeData(date=iso_date_str, themes=special_themes))
+    async def async_get_generation(self) -> int:
+        return await self.hass.async_add_executor_job(self.get_generation)
+
+    def get_generation(self) -> int:
+        """Generation of the theme configs that themes are generated from, the configs are loaded if needed."""
+        with self._memo_lock:
+            self.config_loader.get_configs()
+            return self.config_loader.generation
+
+    async def async_reload_changed(self) -> bool:
+        return await self.hass.async_add_executor_job(self.reload_changed)
+
+    def reload_changed(self) -> bool:
+        """Reload changed custom theme files, only the months that their themes land in are generated again.
+
+        Returns True if any file changed.
+        """
+        with self._memo_lock:
+            memo_is_current = self._memo_generation == self.config_loader.generation
+            affected_rules = self.config_loader.reload_changed()
+            if affected_rules is None:
+                return False
+            if not memo_is_current:
+                return True  # Everything is generated again on next fetch anyway
+
+            # Config indices changed, the index and the floating years that refer to them are cheap to build again
+            self._config_index = None
+            self._floating_years.clear()
+            self._memo_generation = self.config_loader.generation
+
+            affected_months = self.__get_affected_months(affected_rules, {year for (year, _) in self._months.keys()})
+            for month in affected_months:
+                self._months.pop(month)
+            _LOGGER.debug("Custom themes changed, dropped %d generated months", len(affected_months))
+            return True
+
+    def get_themes(self, start: date, end: date) -> list[ThemeData]:
+        """Themes of every day in [start, end], blocking so run it in an executor job."""
+        themes = []
+        for (ordinals, month_themes) in self._get_months(list(DateUtils.months(start, end))):
+            first = bisect.bisect_left(ordinals, start.toordinal())
+            last = bisect.bisect_right(ordinals, end.toordinal())
+            themes.extend(ThemeData(date=theme_data.date, themes=list(theme_data.themes))
+                          for theme_data in month_themes[first:last])
 
         return themes
 
-    def __get_theme_days(self, years: list[int]) -> dict[date, list[str]]:
-        if not hasattr(self, 'theme_configs'):
-            self.theme_configs = self.config_loader.get_configs()
+    def _get_months(self, months: list[tuple[int, int]]) -> list[tuple[list[int], list[ThemeData]]]:
+        """All themes of each (year, month) sorted by date, generated once and kept until the configs are reloaded."""
+        with self._memo_lock:
+            self.config_loader.get_configs()  # Load configs first, so that the first load is not seen as a reload
+            if self._memo_generation != self.config_loader.generation:
+                self._months.clear()
+                self._floating_years.clear()
+                self._config_index = None
+                self._memo_generation = self.config_loader.generation
+
+            theme_months = {month: self._months.get(month) for month in months}
+            missing_months = [month for (month, theme_month) in theme_months.items() if theme_month is None]
+            if len(missing_months) < len(months):
+                _LOGGER.debug("Themes for %d of %d months served from memory (%d hits, %d misses)",
+                              len(months) - len(missing_months), len(months), self._months.hits, self._months.misses)
+
+            if missing_months:
+                generate_start = time.perf_counter()
+                generated = self.__get_theme_days(missing_months)
+                for month in missing_months:
+                    theme_days = generated[month]
+                    theme_months[month] = ([ordinal for (ordinal, _) in theme_days],
+                                           [ThemeData(date=date.fromordinal(ordinal).isoformat(), themes=themes)
+                                            for (ordinal, themes) in theme_days])
+                    self._months.put(month, theme_months[month])
+                _LOGGER.debug("Generated themes for %d months (%s) in %.2f ms",
+                              len(missing_months), missing_months, (time.perf_counter() - generate_start) * 1000)
+
+            return [theme_months[month] for month in months]
+
+    def __get_theme_days(self, months: list[tuple[int, int]]) -> dict[tuple[int, int], list[tuple[int, list[str]]]]:
+        """Date ordinals and themes of each (year, month), sorted by date and with themes in config order.
+
+        Only configs that can land in one of the months are generated, plus the few configs without a fixed month.
+        """
+        configs = self.config_loader.get_configs()
+        config_index = self.__get_config_index(configs)
+        month_days: dict[tuple[int, int], dict[int, list[int]]] = {month: {} for month in months}
+        month_bounds = {(year, month): (date(year, month, 1).toordinal(),
+                                        (date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)).toordinal())
+                        for (year, month) in months}
+
+        def add(key: tuple[int, int], ordinal: int, config_index: int) -> None:
+            (first, end) = month_bounds[key]
+            if first <= ordinal < end:
+                config_indices = month_days[key].setdefault(ordinal, [])
+                if config_index not in config_indices:
+                    config_indices.append(config_index)
+
+        for month in sorted({month for (_, month) in months}):
+            years = [year for (year, wanted_month) in months if wanted_month == month]
+            for (generator, config_indices) in config_index.by_month.get(month, []):
+                for (year, ordinal, i) in self.__generate(generator, configs, config_indices, years):
+                    if (year, month) in month_days:
+                        add((year, month), ordinal, i)
+
+        # Configs without a fixed month can land in the year before or after, e.g. monday of week 1 can be in
+        # december, so january and december also need the dates generated for the adjacent year
+        generation_years = {(year, month): [year] + ([year - 1] if month == 1 else [])
+                            + ([year + 1] if month == 12 else [])
+                            for (year, month) in months}
+        floating = self.__get_floating_years(configs, config_index,
+                                             sorted({year for years in generation_years.values() for year in years}))
+        for (key, years) in generation_years.items():
+            for year in years:
+                for (ordinal, i) in floating[year]:
+                    add(key, ordinal, i)
+
+        return {key: [(ordinal, [configs[i].theme for i in sorted(config_indices)])
+                      for (ordinal, config_indices) in sorted(days.items())]
+                for (key, days) in month_days.items()}
+
+    def __get_floating_years(self, configs: list, config_index: ConfigIndex,
+                             years: list[int]) -> dict[int, list[tuple[int, int]]]:
+        """Date ordinals and config indices of the configs without a fixed month, per year."""
+        floating = {year: self._floating_years.get(year) for year in years}
+        missing_years = [year for (year, year_days) in floating.items() if year_days is None]
+        if missing_years:
+            for year in missing_years:
+                floating[year] = []
+            for (generator, config_indices) in config_index.floating:
+                for (year, ordinal, i) in self.__generate(generator, configs, config_indices, missing_years):
+                    if year in floating:
+                        floating[year].append((ordinal, i))
+            for year in missing_years:
+                self._floating_years.put(year, floating[year])
+
+        return floating
+
+    def __get_affected_months(self, rules: list[ThemeRule], years: set[int]) -> set[tuple[int, int]]:
+        """(year, month) of every date that the rules give in the years."""
+        if not years:
+            return set()
+
+        # Dates generated for the years before and after can land in the years, like when the themes are generated
+        year_range = range(min(years) - 1, max(years) + 2)
+        affected_months = set()
+        for rule in rules:
+            generator = self.generators.get(rule.generator)
+            if generator is None:
+                continue
+            for ordinal in generator.generate_bulk([rule], year_range):
+                if ordinal:
+                    day = date.fromordinal(ordinal)
+                    affected_months.add((day.year, day.month))
+        return affected_months
 
-        theme_days = {}
-        for config in self.theme_configs:
-            generator: ThemeDateGenerator = self.generator_config.get(config['generator'])
+    @staticmethod
+    def __generate(generator: ThemeDateGenerator, configs: list, config_indices: list[int],
+                   years: list[int]) -> Iterator[tuple[int, int, int]]:
+        """(year, ordinal, config index) of the configs over all years from the first to the last of years."""
+        year_range = range(min(years), max(years) + 1)
+        ordinals = generator.generate_bulk([configs[i] for i in config_indices], year_range)
+        for (n, config_index) in enumerate(config_indices):
+            for (year, ordinal) in zip(year_range, ordinals[n * len(year_range):(n + 1) * len(year_range)]):
+                if ordinal:
+                    yield year, ordinal, config_index
+
+    def __get_config_index(self, configs: list) -> ConfigIndex:
+        if self._config_index is None:
+            self._config_index = ConfigIndex(configs, self.generators)
+
+        return self._config_index
+
+
+class ConfigIndex:
+    """Config indices grouped by generator and bucketed by the months their dates can land in."""
+
+    def __init__(self, configs: list[ThemeRule], generators: GeneratorRegistry):
+        by_month: dict[int, dict[str, list[int]]] = {}
+        floating: dict[str, list[int]] = {}
+        for (i, config) in enumerate(configs):
+            generator = generators.get(config.generator)
             if generator is None:
                 _LOGGER.warning(f'{config} does not have a matching generator, skipping...')
                 continue
-            for year in years:
-                date_of_theme = generator.generate(config, year)
-                if date_of_theme is None:
-                    continue
-                themes = theme_days.get(date_of_theme) or []
-                themes.append(config['theme'])
-                theme_days[date_of_theme] = themes
-
-        return theme_days
+
+            months = generator.possible_months(config)
+            if months is None:
+                floating.setdefault(config.generator, []).append(i)
+            for month in months or []:
+                by_month.setdefault(month, {}).setdefault(config.generator, []).append(i)
+
+        self.by_month: dict[int, list[tuple[ThemeDateGenerator, list[int]]]] = {
+            month: [(generators.get(name), indices) for (name, indices) in groups.items()]
+            for (month, groups) in by_month.items()}
+        self.floating: list[tuple[ThemeDateGenerator, list[int]]] = [
+            (generators.get(name), indices) for (name, indices) in floating.items()]
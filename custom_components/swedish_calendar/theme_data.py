@@ -1,17 +1,24 @@
+from __future__ import annotations
+
 import asyncio
 from datetime import date
 from functools import partial
+import hashlib
 import json
 import logging
-from typing import Any
+import os
+import threading
+import time
 
 import aiohttp
+from aiohttp import hdrs
 import async_timeout
 
 from homeassistant.core import HomeAssistant
 
+from .theme_index import CompiledThemeIndex, ThemeDateIndex
 from .types import SpecialThemesConfig, ThemeData
-from .utils import DateUtils
+from .utils import SingleFlight
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -20,72 +27,202 @@ class ThemeDataProvider:
     def __init__(self, hass, theme_path):
         self._hass = hass
         self._theme_path = theme_path
+        self._index_path = f'{os.path.splitext(theme_path)[0]}.idx'
+        self._index: CompiledThemeIndex | ThemeDateIndex | None = None
+        self._index_source: tuple[int, int] | None = None
+        # An index is only closed once no query reads it anymore, invalidate() can run while queries are running
+        self._readers: dict[CompiledThemeIndex | ThemeDateIndex, int] = {}
+        self._retired: set[CompiledThemeIndex | ThemeDateIndex] = set()
+        self._lock = threading.Lock()  # Held briefly, also taken on the event loop by invalidate()
+        self._open_lock = threading.Lock()  # Only one executor job opens or compiles the index
 
     async def fetch_data(self, start: date, end: date) -> list[ThemeData]:
         return await self._hass.async_add_executor_job(partial(self._fetch_data, start=start, end=end))
 
+    def invalidate(self) -> None:
+        """Drop the opened index, it is opened (and compiled if needed) again on next fetch."""
+        with self._lock:
+            self._retire(self._index)
+            self._index = None
+
     def _fetch_data(self, start: date, end: date) -> list[ThemeData]:
-        theme_dates = []
+        index = self._acquire_index()
+        if index is None:
+            return []
+
+        try:
+            query_start = time.perf_counter()
+            theme_dates = index.query(start, end)
+        finally:
+            self._release_index(index)
+        _LOGGER.debug("Found %d theme days between %s and %s in %.2f ms",
+                      len(theme_dates), start, end, (time.perf_counter() - query_start) * 1000)
+        return theme_dates
+
+    def _acquire_index(self) -> CompiledThemeIndex | ThemeDateIndex | None:
+        with self._open_lock:
+            stat = os.stat(self._theme_path)
+            source = (stat.st_mtime_ns, stat.st_size)
+            with self._lock:
+                if self._index is not None and source == self._index_source:
+                    return self._hold(self._index)
+
+            open_start = time.perf_counter()
+            index = CompiledThemeIndex.open(self._index_path, *source) or self._compile_index(*source)
+            with self._lock:
+                self._retire(self._index)
+                self._index = index
+                self._index_source = source
+                if index is None:
+                    return None
+                _LOGGER.debug("Opened theme index %s with %d days in %.2f ms",
+                              self._index_path, len(index), (time.perf_counter() - open_start) * 1000)
+                return self._hold(index)
+
+    def _hold(self, index: CompiledThemeIndex | ThemeDateIndex) -> CompiledThemeIndex | ThemeDateIndex:
+        self._readers[index] = self._readers.get(index, 0) + 1
+        return index
+
+    def _release_index(self, index: CompiledThemeIndex | ThemeDateIndex) -> None:
+        with self._lock:
+            self._readers[index] -= 1
+            if self._readers[index] == 0:
+                del self._readers[index]
+                if index in self._retired:
+                    self._retired.remove(index)
+                    index.close()
+
+    def _retire(self, index: CompiledThemeIndex | ThemeDateIndex | None) -> None:
+        if index is None:
+            return
+        if index in self._readers:
+            self._retired.add(index)  # Closed by the last reader
+        else:
+            index.close()
+
+    def _compile_index(self, source_mtime_ns: int,
+                       source_size: int) -> CompiledThemeIndex | ThemeDateIndex | None:
         try:
             with open(self._theme_path) as data_file:
                 data = json.load(data_file)
-            theme_dates = ThemeDataProvider._map_to_theme_dates(data, start, end)
         except json.JSONDecodeError as err:
             _LOGGER.error("Invalid json in special themes json, path: %s, %s", self._theme_path, err)
+            return None
 
-        return theme_dates
-
-    @staticmethod
-    def _map_to_theme_dates(json_data: dict[str, Any], start: date, end: date) -> list[ThemeData]:
-        special_themes = json_data['themeDays']
-        themes = []
+        try:
+            compiled = CompiledThemeIndex.compile(data, source_mtime_ns, source_size)
+        except ValueError as err:
+            _LOGGER.warning("Could not compile theme index, querying the parsed json instead: %s", err)
+            return ThemeDateIndex(data)
 
-        for day in DateUtils.range(start, end):
-            date_str = day.strftime('%Y%m%d')
-            iso_date_str = day.strftime('%Y-%m-%d')
+        tmp_path = f'{self._index_path}.tmp'
+        try:
+            with open(tmp_path, 'wb') as index_file:
+                index_file.write(compiled)
+            os.replace(tmp_path, self._index_path)
+        except OSError as err:
+            _LOGGER.debug("Could not write theme index %s, keeping it in memory: %s", self._index_path, err)
+            return CompiledThemeIndex(compiled, source_mtime_ns, source_size)
 
-            if date_str in special_themes:
-                theme_list = list(map(lambda x: x['event'], special_themes[date_str]))
-                themes.append(ThemeData(iso_date_str, theme_list))
-        return themes
+        return CompiledThemeIndex.open(self._index_path, source_mtime_ns, source_size) or \
+            CompiledThemeIndex(compiled, source_mtime_ns, source_size)
 
 
 class ThemeDataUpdater:
+    _in_flight_updates = SingleFlight()  # Shared by all updaters
+
     def __init__(self, hass: HomeAssistant, config: SpecialThemesConfig, session: aiohttp.ClientSession):
         self._hass = hass
         self._config = config
         self._session = session
         self._url = 'https://raw.githubusercontent.com/Miicroo/ha-swedish_calendar/master/custom_components' \
                     '/swedish_calendar/specialThemes.json'
+        self._meta_path = f'{config.path}.meta'  # ETag and Last-Modified of the last download
 
     def can_update(self):
         return self._config.auto_update and self._config.path is not None
 
-    async def update(self):
-        new_data = await self._download()
-        if new_data:
-            await self._hass.async_add_executor_job(partial(self._write_update, new_data=new_data))
+    async def update(self) -> bool:
+        """Download the latest themes, returns True if the themes changed."""
+        # Concurrent updates of the same file share one download and one write
+        return await ThemeDataUpdater._in_flight_updates.run((self._url, self._config.path), self._update)
+
+    async def _update(self) -> bool:
+        meta = await self._hass.async_add_executor_job(self._read_meta)
+        new_data = await self._download(meta)
+        if new_data is None:
+            return False
+
+        return await self._hass.async_add_executor_job(partial(self._write_update, new_data=new_data, meta=meta))
 
-    def _write_update(self, new_data):
-        with open(self._config.path, 'w') as themes_file:
+    def _write_update(self, new_data: bytes, meta: dict[str, str]) -> bool:
+        if hashlib.sha256(new_data).hexdigest() == self._hash_current_file():
+            _LOGGER.debug('Themes are already up to date')
+            self._write_meta(meta)
+            return False
+
+        tmp_path = f'{self._config.path}.tmp'
+        with open(tmp_path, 'wb') as themes_file:
             themes_file.write(new_data)
-            _LOGGER.info('Themes updated with latest json')
+        os.replace(tmp_path, self._config.path)  # Atomic, readers never see a half written file
+        self._write_meta(meta)
+        _LOGGER.info('Themes updated with latest json')
+        return True
+
+    def _hash_current_file(self) -> str | None:
+        try:
+            with open(self._config.path, 'rb') as themes_file:
+                return hashlib.sha256(themes_file.read()).hexdigest()
+        except OSError:
+            return None
+
+    def _read_meta(self) -> dict[str, str]:
+        if not os.path.exists(self._config.path):
+            return {}  # Validators are only valid for the file they were downloaded with
+        try:
+            with open(self._meta_path) as meta_file:
+                meta = json.load(meta_file)
+            return meta if isinstance(meta, dict) else {}
+        except (OSError, json.JSONDecodeError):
+            return {}
 
-    async def _download(self) -> str | None:
+    def _write_meta(self, meta: dict[str, str]) -> None:
+        try:
+            with open(self._meta_path, 'w') as meta_file:
+                json.dump(meta, meta_file)
+        except OSError as err:
+            _LOGGER.debug('Could not write %s, next update will not be conditional: %s', self._meta_path, err)
+
+    async def _download(self, meta: dict[str, str]) -> bytes | None:
+        """Download the themes if they changed since last download, meta is updated with the new validators."""
         _LOGGER.debug("Downloading latest themes")
-        response_data: str | None = None
+        headers = {hdrs.ACCEPT_ENCODING: 'gzip'}
+        if 'etag' in meta:
+            headers[hdrs.IF_NONE_MATCH] = meta['etag']
+        if 'last_modified' in meta:
+            headers[hdrs.IF_MODIFIED_SINCE] = meta['last_modified']
+
+        response_data: bytes | None = None
         try:
             with async_timeout.timeout(10):
-                resp = await self._session.get(self._url)
+                resp = await self._session.get(self._url, headers=headers)
 
-            if resp.status != 200:
+            if resp.status == 304:
+                _LOGGER.debug("Themes not modified since last download")
+            elif resp.status != 200:
                 raise aiohttp.ClientError(f'Failed to fetch data for: {self._url}, response code: {resp.status}')
             else:
-                response_data = await resp.text()
+                response_data = await resp.read()
                 json.loads(response_data)  # Test that data can be loaded as json
+                for (header, key) in ((hdrs.ETAG, 'etag'), (hdrs.LAST_MODIFIED, 'last_modified')):
+                    if header in resp.headers:
+                        meta[key] = resp.headers[header]
+                    else:
+                        meta.pop(key, None)
         except (asyncio.TimeoutError, aiohttp.ClientError) as err:
             _LOGGER.warning('Error when calling: %s, %s', self._url, err)
         except json.JSONDecodeError as err:
             _LOGGER.error("Invalid json, error: %s", err)
+            response_data = None
 
         return response_data
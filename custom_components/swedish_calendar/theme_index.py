@@ -0,0 +1,156 @@
+"""Compact binary index of specialThemes.json, that can be memory mapped and queried without parsing any json.
+
+Layout, arrays are stored in native byte order (which is part of the header):
+    header      magic, version, byte order, source mtime (ns), source size, first date ordinal, day count,
+                theme name count, theme count
+    name ends   theme name count x u32, end of each name in the name blob
+    offsets     (day count + 1) x u32, themes of day i are theme ids [offsets[i], offsets[i + 1])
+    theme ids   theme count x u16, index into names
+    name blob   utf-8 encoded theme names, every theme name is only stored once
+"""
+from __future__ import annotations
+
+from array import array
+import bisect
+from datetime import date
+import mmap
+import struct
+import sys
+from typing import Any
+
+from .types import ThemeData
+
+_MAGIC = b'SCTI'
+_VERSION = 1
+_HEADER = struct.Struct('<4sHB1xqqIIII')
+_MAX_THEME_NAMES = 1 << 16  # Theme ids are stored as u16
+
+
+class CompiledThemeIndex:
+
+    def __init__(self, buffer: bytes | mmap.mmap, source_mtime_ns: int, source_size: int):
+        self._buffer = buffer
+        (magic, version, little_endian, mtime_ns, size,
+         self._first_ordinal, self._day_count, name_count, theme_count) = _HEADER.unpack_from(buffer, 0)
+
+        self.is_valid = magic == _MAGIC and version == _VERSION and \
+            bool(little_endian) == (sys.byteorder == 'little') and \
+            mtime_ns == source_mtime_ns and size == source_size
+        if not self.is_valid:
+            return
+
+        # Nothing is read up front, names are decoded the first time they are queried
+        view = memoryview(buffer)
+        position = _HEADER.size
+        self._name_ends = view[position:position + name_count * 4].cast('I')
+        position += name_count * 4
+        self._offsets = view[position:position + (self._day_count + 1) * 4].cast('I')
+        position += (self._day_count + 1) * 4
+        self._theme_ids = view[position:position + theme_count * 2].cast('H')
+        position += theme_count * 2
+        self._name_blob = view[position:]
+        self._names: dict[int, str] = {}
+
+    @staticmethod
+    def open(index_path: str, source_mtime_ns: int, source_size: int) -> CompiledThemeIndex | None:
+        """Memory map a compiled index, returns None if it is missing or does not belong to the source."""
+        try:
+            with open(index_path, 'rb') as index_file:
+                buffer = mmap.mmap(index_file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+
+        if len(buffer) < _HEADER.size:
+            buffer.close()
+            return None
+
+        index = CompiledThemeIndex(buffer, source_mtime_ns, source_size)
+        if not index.is_valid:
+            index.close()
+            return None
+        return index
+
+    @staticmethod
+    def compile(json_data: dict[str, Any], source_mtime_ns: int, source_size: int) -> bytes:
+        """Raises ValueError if there are more distinct theme names than theme ids can tell apart."""
+        theme_days = _theme_days(json_data)
+        first_ordinal = min(theme_days) if len(theme_days) > 0 else 0
+        day_count = max(theme_days) - first_ordinal + 1 if len(theme_days) > 0 else 0
+
+        name_ids: dict[str, int] = {}
+        offsets = array('I', [0])
+        theme_ids = array('H')
+        for ordinal in range(first_ordinal, first_ordinal + day_count):
+            for theme in theme_days.get(ordinal, []):
+                theme_id = name_ids.setdefault(theme, len(name_ids))
+                if theme_id >= _MAX_THEME_NAMES:
+                    raise ValueError(f'More than {_MAX_THEME_NAMES} distinct themes, which the index does not support')
+                theme_ids.append(theme_id)
+            offsets.append(len(theme_ids))
+
+        name_blob = bytearray()
+        name_ends = array('I')
+        for name in name_ids:
+            name_blob += name.encode('utf-8')
+            name_ends.append(len(name_blob))
+
+        header = _HEADER.pack(_MAGIC, _VERSION, sys.byteorder == 'little', source_mtime_ns, source_size,
+                              first_ordinal, day_count, len(name_ids), len(theme_ids))
+        return header + name_ends.tobytes() + offsets.tobytes() + theme_ids.tobytes() + bytes(name_blob)
+
+    def query(self, start: date, end: date) -> list[ThemeData]:
+        first = max(start.toordinal() - self._first_ordinal, 0)
+        last = min(end.toordinal() - self._first_ordinal, self._day_count - 1)
+
+        theme_dates = []
+        for day in range(first, last + 1):
+            theme_start, theme_end = self._offsets[day], self._offsets[day + 1]
+            if theme_end > theme_start:
+                themes = [self._name(theme_id) for theme_id in self._theme_ids[theme_start:theme_end]]
+                theme_dates.append(ThemeData(date.fromordinal(self._first_ordinal + day).isoformat(), themes))
+        return theme_dates
+
+    def _name(self, theme_id: int) -> str:
+        name = self._names.get(theme_id)
+        if name is None:
+            name_start = self._name_ends[theme_id - 1] if theme_id > 0 else 0
+            name = bytes(self._name_blob[name_start:self._name_ends[theme_id]]).decode('utf-8')
+            self._names[theme_id] = name
+        return name
+
+    def close(self) -> None:
+        if self.is_valid:
+            for view in (self._name_ends, self._offsets, self._theme_ids, self._name_blob):
+                view.release()
+        if isinstance(self._buffer, mmap.mmap):
+            self._buffer.close()
+
+    def __len__(self) -> int:
+        return self._day_count
+
+
+class ThemeDateIndex:
+    """Theme days of the parsed json sorted by date, used when the json can not be compiled into an index."""
+
+    def __init__(self, json_data: dict[str, Any]):
+        theme_days = sorted(_theme_days(json_data).items())
+        self._ordinals = [ordinal for (ordinal, _) in theme_days]
+        self._themes = [themes for (_, themes) in theme_days]
+
+    def query(self, start: date, end: date) -> list[ThemeData]:
+        first = bisect.bisect_left(self._ordinals, start.toordinal())
+        last = bisect.bisect_right(self._ordinals, end.toordinal())
+        return [ThemeData(date.fromordinal(ordinal).isoformat(), list(themes))
+                for (ordinal, themes) in zip(self._ordinals[first:last], self._themes[first:last])]
+
+    def close(self) -> None:
+        pass
+
+    def __len__(self) -> int:
+        return len(self._ordinals)
+
+
+def _theme_days(json_data: dict[str, Any]) -> dict[int, list[str]]:
+    return {date(int(date_str[0:4]), int(date_str[4:6]), int(date_str[6:8])).toordinal():
+            [special_theme['event'] for special_theme in day_themes]
+            for (date_str, day_themes) in json_data['themeDays'].items()}
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import copy
 import datetime
 from datetime import timedelta
 import json
@@ -44,6 +45,9 @@ class SwedishCalendar:
         self._themes = themes
         return self
 
+    def has_api_data(self) -> bool:
+        return self._api_data is not None
+
     def get_value_by_attribute(self, attr: str) -> Any:
         if attr != 'themes':
             return getattr(self._api_data, attr) if self._api_data is not None else None
@@ -63,7 +67,8 @@ class ApiData:
                  reason_for_flagging: str | None,
                  eve: str | None,
                  holiday: str | None,
-                 day_before_work_free_holiday: bool):
+                 day_before_work_free_holiday: bool,
+                 bridge_day: bool = False):
         self.date: str = date
         self.weekday: str = weekday
         self.work_free_day: bool = work_free_day
@@ -75,6 +80,7 @@ class ApiData:
         self.eve: str | None = eve
         self.holiday: str | None = holiday
         self.day_before_work_free_holiday: bool = day_before_work_free_holiday
+        self.bridge_day: bool = bridge_day
 
     @staticmethod
     def from_json(json_data: dict[str, Any]) -> ApiData:
@@ -92,6 +98,23 @@ class ApiData:
             day_before_work_free_holiday=ApiData._to_optional_bool(json_data, "dag före arbetsfri helgdag")
         )
 
+    @staticmethod
+    def with_bridge_days(swedish_dates: list[ApiData]) -> list[ApiData]:
+        """Copies of the days sorted by date, with bridge days (klämdagar) marked.
+
+        A bridge day is a work day between two work free days. The days can be shared with the api data cache, so
+        they are left untouched. The first and last day have no known neighbours, they keep their bridge day.
+        """
+        ordinals = [datetime.date.fromisoformat(api_data.date).toordinal() for api_data in swedish_dates]
+        order = sorted(range(len(swedish_dates)), key=lambda i: ordinals[i])
+        ordinals = [ordinals[i] for i in order]
+        marked = [copy.copy(swedish_dates[i]) for i in order]
+        for i in range(1, len(marked) - 1):
+            if ordinals[i + 1] - ordinals[i - 1] == 2:  # Only consecutive days
+                (before, today, after) = marked[i - 1:i + 2]
+                today.bridge_day = before.work_free_day and not today.work_free_day and after.work_free_day
+        return marked
+
     @staticmethod
     def _to_bool(value: str) -> bool:
         return value is not None and value == 'Ja'
@@ -131,7 +154,14 @@ class CalendarConfig:
 
 
 class CacheConfig:
-    def __init__(self, enabled: bool, cache_dir: str, retention: timedelta):
+    def __init__(self,
+                 enabled: bool,
+                 cache_dir: str,
+                 retention: timedelta,
+                 stale_while_revalidate: bool = False,
+                 max_size: int = 1024 * 1024):
         self.enabled = enabled
         self.cache_dir = cache_dir
         self.retention = retention
+        self.stale_while_revalidate = stale_while_revalidate
+        self.max_size = max_size  # In bytes
@@ -1,5 +1,13 @@
-from collections.abc import Generator
+import asyncio
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Generator
+from contextlib import contextmanager
 from datetime import date, datetime, timedelta
+import logging
+import time
+from typing import Any
+
+_LOGGER = logging.getLogger(__name__)
 
 
 class DateUtils:
@@ -8,6 +16,13 @@ class DateUtils:
         for n in range(int((end - start).days) + 1):
             yield start + timedelta(n)
 
+    @staticmethod
+    def months(start: date, end: date) -> Generator[tuple[int, int]]:
+        year, month = start.year, start.month
+        while (year, month) <= (end.year, end.month):
+            yield year, month
+            year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
     @staticmethod
     def in_range(isodate: str, start: date, end: date) -> bool:
         return start <= date.fromisoformat(isodate) <= end
@@ -20,3 +35,77 @@ class DateUtils:
         diff = midnight - from_time
 
         return diff.days*86400 + diff.seconds + 1
+
+
+class LoopBlockingTimer:
+    """Sums up the time spent in synchronous sections, i.e. time where the event loop is blocked."""
+
+    def __init__(self):
+        self.seconds = 0.0
+
+    @contextmanager
+    def measure(self) -> Generator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds += time.perf_counter() - start
+
+
+class LruCache:
+    """Bounded mapping that evicts the least recently used entry, counting hits, misses and evictions."""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict[Any, Any] = OrderedDict()
+
+    def get(self, key: Any) -> Any | None:
+        if key not in self._entries:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return self._entries[key]
+
+    def put(self, key: Any, value: Any) -> None:
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def pop(self, key: Any) -> Any | None:
+        return self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def keys(self) -> list[Any]:
+        return list(self._entries)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SingleFlight:
+    """Lets concurrent callers with the same key share one in-flight call instead of making their own."""
+
+    def __init__(self):
+        self.coalesced = 0  # Number of calls that joined a call already in flight
+        self._in_flight: dict[Any, asyncio.Future] = {}
+
+    async def run(self, key: Any, call: Callable[[], Awaitable[Any]]) -> Any:
+        if key in self._in_flight:
+            self.coalesced += 1
+            _LOGGER.debug("Joining in-flight call for %s, %d calls coalesced so far", key, self.coalesced)
+            return await asyncio.shield(self._in_flight[key])
+
+        future = asyncio.ensure_future(call())
+        self._in_flight[key] = future
+        future.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        # Shielded, so that a cancelled caller does not cancel the call for everyone else
+        return await asyncio.shield(future)
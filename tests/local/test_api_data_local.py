@@ -0,0 +1,124 @@
+"""Test local api data provider."""
+from datetime import date, timedelta
+
+import pytest
+
+from custom_components.swedish_calendar.local.api_data_local import (
+    _WEEKDAYS,
+    LocalApiDataProvider,
+)
+from custom_components.swedish_calendar.local.flag_days import get_flag_days
+from custom_components.swedish_calendar.local.holidays import get_holidays
+from custom_components.swedish_calendar.local.themes.theme_data_local import (
+    LocalThemeDataProvider,
+)
+from custom_components.swedish_calendar.types import ApiData
+from custom_components.swedish_calendar.utils import DateUtils
+
+
+@pytest.mark.parametrize(
+    ("start", "end"),
+    [
+        (date(2020, 12, 21), date(2021, 1, 10)),  # 2020 has week 53
+        (date(2024, 12, 23), date(2025, 1, 12)),  # Week 1 of 2025 starts in 2024
+        (date(2026, 12, 28), date(2027, 1, 10)),  # 2027 starts in week 53
+        (date(2023, 3, 30), date(2023, 4, 6)),  # Ends the day before Långfredag
+        (date(2022, 1, 1), date(2022, 12, 31)),
+    ],
+)
+async def test_fetch_data_matches_per_day_api_data(hass, monkeypatch, start, end):
+    """The columns give the same api data as building each day on its own."""
+    provider = _provider(hass, monkeypatch)
+    themes = provider.theme_data_provider.get_themes(start, end + timedelta(days=1))
+
+    api_data = provider._fetch_data(start, end, themes)
+
+    assert [vars(day) for day in api_data] == [
+        vars(day) for day in _per_day_api_data(provider, start, end, themes)
+    ]
+
+
+async def test_fetch_data_at_year_boundaries_and_holidays(hass, monkeypatch):
+    """Spot check weeks, flags, eves and holidays of the columns."""
+    provider = _provider(hass, monkeypatch)
+    (api_data, _) = provider._fetch_calendar_data(date(2020, 12, 24), date(2021, 4, 1))
+    days = {day.date: day for day in api_data}
+
+    assert (days["2020-12-31"].week, days["2021-01-03"].week) == (53, 53)
+    assert days["2021-01-04"].week == 1
+    assert days["2020-12-24"].holiday == "Julafton"
+    assert days["2020-12-24"].work_free_day and not days["2020-12-24"].red_day
+    assert days["2020-12-25"].red_day and days["2020-12-25"].work_free_day
+    assert days["2021-01-05"].eve == "Trettondagsafton"
+    assert days["2021-01-05"].holiday is None
+    assert not days["2021-01-05"].work_free_day
+    assert days["2021-01-05"].day_before_work_free_holiday
+    assert days["2021-01-06"].red_day and days["2021-01-06"].work_free_day
+    assert not days["2021-01-07"].red_day and not days["2021-01-07"].work_free_day
+    # The last day, Skärtorsdagen, is the day before Långfredagen
+    assert api_data[-1].date == "2021-04-01"
+    assert api_data[-1].eve == "Skärtorsdagen"
+    assert api_data[-1].day_before_work_free_holiday
+
+
+async def test_fetch_calendar_data_matches_separate_providers(hass, monkeypatch):
+    """Api data and themes both cover the range and match what each provider gives."""
+    provider = _provider(hass, monkeypatch)
+    (start, end) = (date(2021, 3, 25), date(2021, 4, 1))
+
+    (api_data, themes) = await provider.fetch_calendar_data(start, end)
+
+    assert [day.date for day in api_data] == [
+        day.isoformat() for day in DateUtils.range(start, end)
+    ]
+    assert [vars(day) for day in api_data] == [
+        vars(day)
+        for day in _per_day_api_data(
+            provider,
+            start,
+            end,
+            provider.theme_data_provider.get_themes(start, end + timedelta(days=1)),
+        )
+    ]
+    assert [(theme.date, theme.themes) for theme in themes] == [
+        (theme.date, theme.themes)
+        for theme in await provider.theme_data_provider.fetch_data(start, end)
+    ]
+    assert all(start.isoformat() <= theme.date <= end.isoformat() for theme in themes)
+
+
+def _provider(hass, monkeypatch):
+    # A theme provider of its own, the process wide one keeps the hass that created it
+    monkeypatch.setattr(LocalThemeDataProvider, "_instance", None)
+    return LocalApiDataProvider(hass)
+
+
+def _per_day_api_data(provider, start, end, themes):
+    holidays = get_holidays(start, end, themes)
+    flag_days = get_flag_days(start, end, themes)
+    all_api_data = []
+    for day in DateUtils.range(start, end):
+        holidays_today = holidays.get(day.isoformat(), [])
+        holidays_tomorrow = holidays.get((day + timedelta(days=1)).isoformat(), [])
+        work_free_holiday = provider._is_work_free_holiday(holidays_today)
+        work_free_today = day.isoweekday() >= 6 or work_free_holiday
+        all_api_data.append(
+            ApiData(
+                date=day.isoformat(),
+                weekday=_WEEKDAYS[day.weekday()],
+                week=day.isocalendar().week,
+                day_of_week_index=day.isoweekday(),
+                red_day=day.isoweekday() == 7
+                or any(config.red_day for (_, config) in holidays_today),
+                work_free_day=work_free_today,
+                eve=provider._eve(holidays_today),
+                holiday=provider._holiday(holidays_today),
+                day_before_work_free_holiday=provider._is_work_free_holiday(
+                    holidays_tomorrow
+                )
+                and not work_free_today,
+                reason_for_flagging=", ".join(flag_days.get(day.isoformat(), [])),
+                name_day=provider.name_day_provider.get_names(day.strftime("%m-%d")),
+            )
+        )
+    return all_api_data
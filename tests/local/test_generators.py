@@ -0,0 +1,148 @@
+"""Test local theme generators."""
+from datetime import date, timedelta
+
+import ephem
+
+from custom_components.swedish_calendar.local.themes.generators import equinox_solstice
+from custom_components.swedish_calendar.local.themes.generators.ascension import (
+    AscensionGenerator,
+)
+from custom_components.swedish_calendar.local.themes.generators.easter import (
+    EasterGenerator,
+    easter_dates,
+    gauss_easter,
+)
+from custom_components.swedish_calendar.local.themes.generators.fast_days import (
+    FastDaysGenerator,
+)
+from custom_components.swedish_calendar.local.themes.generators.pentecost import (
+    PentecostGenerator,
+)
+from custom_components.swedish_calendar.local.themes.generators.same_date import (
+    SameDateGenerator,
+)
+from custom_components.swedish_calendar.local.themes.generators.xth_weekday_of_month import (
+    XthWeekdayOfMonthGenerator,
+)
+from custom_components.swedish_calendar.local.themes.rules import ThemeRule
+
+
+def _generate_one_by_one(generator, configs, years):
+    return [
+        generator.generate(config, year).toordinal()
+        for config in configs
+        for year in years
+    ]
+
+
+def test_same_date_generate_bulk_matches_generate():
+    """Bulk generation gives the same dates as generating one config and year at a time."""
+    generator = SameDateGenerator()
+    configs = [
+        ThemeRule("a", "same_date", month=1, day=1),
+        ThemeRule("b", "same_date", month=3, day=1),
+        ThemeRule("c", "same_date", month=12, day=31),
+    ]
+    years = range(2019, 2026)
+
+    assert list(generator.generate_bulk(configs, years)) == _generate_one_by_one(
+        generator, configs, years
+    )
+
+
+def test_same_date_generate_bulk_skips_leap_day_in_common_years():
+    """29 February only has a date in leap years."""
+    ordinals = SameDateGenerator().generate_bulk(
+        [ThemeRule("Skottdagen", "same_date", month=2, day=29)], range(2023, 2025)
+    )
+
+    assert list(ordinals)[0] == 0
+    assert list(ordinals)[1] != 0
+
+
+def test_xth_weekday_of_month_generate_bulk_matches_generate():
+    """Bulk generation gives the same dates as generating one config and year at a time."""
+    generator = XthWeekdayOfMonthGenerator()
+    configs = [
+        ThemeRule("t", "xth_weekday_of_month", month=5, weekday=7, xth=1),
+        ThemeRule("t", "xth_weekday_of_month", month=11, weekday=6, xth=2),
+        ThemeRule("t", "xth_weekday_of_month", month=2, weekday=1, xth=4),
+    ]
+    years = range(2019, 2026)
+
+    assert list(generator.generate_bulk(configs, years)) == _generate_one_by_one(
+        generator, configs, years
+    )
+
+
+def _anonymous_gregorian_easter(year):
+    """Easter Sunday by the Meeus/Jones/Butcher algorithm, independent of gauss_easter."""
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7  # noqa: E741
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+
+def test_easter_based_generators_match_direct_computation():
+    """The shared Easter table gives the same dates as computing Easter directly, 1970-2100."""
+    generators = {
+        EasterGenerator(): (-3, -2, -1, 0, 1),
+        AscensionGenerator(): (38, 39),
+        PentecostGenerator(): (48, 49, 50),
+        FastDaysGenerator(): (-49, -48, -47, -46),
+    }
+
+    for year in range(1970, 2101):
+        easter_sunday = _anonymous_gregorian_easter(year)
+        assert gauss_easter(year) == easter_sunday
+        for (generator, offsets) in generators.items():
+            for (index, offset) in enumerate(offsets):
+                config = ThemeRule("t", generator.name(), index=index)
+                assert generator.generate(config, year) == easter_sunday + timedelta(
+                    days=offset
+                )
+            assert easter_dates(year, offsets) == tuple(
+                easter_sunday + timedelta(days=offset) for offset in offsets
+            )
+
+
+def _ephem_equinox_solstice(year):
+    start_of_year = date(year, 1, 1)
+    return tuple(
+        event(start_of_year).datetime().date()
+        for event in (
+            ephem.next_vernal_equinox,
+            ephem.next_summer_solstice,
+            ephem.next_autumnal_equinox,
+            ephem.next_winter_solstice,
+        )
+    )
+
+
+def test_equinox_solstice_table_matches_ephem():
+    """The precomputed table gives the dates ephem computes, 1970-2100."""
+    for year in range(1970, 2101):
+        assert equinox_solstice._get_dates(year) == _ephem_equinox_solstice(year)
+
+
+def test_equinox_solstice_outside_table_uses_ephem():
+    """Years outside of the table are computed with ephem."""
+    assert equinox_solstice._get_dates(1969) == (
+        date(1969, 3, 20),
+        date(1969, 6, 21),
+        date(1969, 9, 23),
+        date(1969, 12, 22),
+    )
+    assert equinox_solstice._get_dates(2101) == (
+        date(2101, 3, 20),
+        date(2101, 6, 21),
+        date(2101, 9, 23),
+        date(2101, 12, 22),
+    )
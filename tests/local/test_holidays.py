@@ -0,0 +1,37 @@
+"""Test local holidays."""
+from datetime import date
+
+from custom_components.swedish_calendar.local.holidays import get_holidays
+from custom_components.swedish_calendar.types import ThemeData
+
+
+def test_get_holidays_uses_rules_of_each_year():
+    """A span over 2004/2005 gets the rules of the year of each date."""
+    themes = [
+        ThemeData("2004-05-31", ["Annandag pingst"]),
+        ThemeData("2004-06-06", ["Sveriges nationaldag"]),
+        ThemeData("2005-05-16", ["Annandag pingst"]),
+        ThemeData("2005-06-06", ["Sveriges nationaldag"]),
+    ]
+
+    holidays = get_holidays(date(2004, 1, 1), date(2005, 12, 31), themes)
+
+    assert holidays["2004-05-31"][0][1].work_free
+    assert not holidays["2004-06-06"][0][1].work_free
+    assert not holidays["2005-05-16"][0][1].work_free
+    assert holidays["2005-06-06"][0][1].red_day
+
+
+def test_get_holidays_flag_day_before_1983():
+    """Svenska flaggans dag is a holiday (but not work free) before 1983."""
+    themes = [
+        ThemeData("1982-06-06", ["Svenska flaggans dag"]),
+        ThemeData("1983-06-06", ["Svenska flaggans dag"]),
+    ]
+
+    holidays = get_holidays(date(1982, 1, 1), date(1983, 12, 31), themes)
+
+    (holiday, config) = holidays["1982-06-06"][0]
+    assert holiday == "Svenska flaggans dag"
+    assert not config.work_free
+    assert "1983-06-06" not in holidays
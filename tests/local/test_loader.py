@@ -0,0 +1,79 @@
+"""Test the theme config loader."""
+import json
+from unittest.mock import patch
+
+from custom_components.swedish_calendar.local.themes.loader import ThemeConfigLoader
+
+
+def _write_custom_themes(config_dir, configs):
+    themes_dir = config_dir / "swedish_calendar" / "themes"
+    themes_dir.mkdir(parents=True, exist_ok=True)
+    (themes_dir / "custom.json").write_text(json.dumps(configs), encoding="iso-8859-1")
+
+
+async def test_compiled_rules_are_reused(hass, tmp_path):
+    """Rules are compiled once, later loads read them from the cache file until a source changes."""
+    hass.config.config_dir = str(tmp_path)
+    _write_custom_themes(
+        tmp_path,
+        [
+            {"theme": "Egen dag", "generator": "same_date", "month": 6, "day": 1},
+            {"theme": "Trasig dag", "generator": "same_date", "month": 13, "day": 1},
+            {"theme": "Skottdag", "generator": "same_date", "month": 2, "day": 29},
+            {"theme": "Trasig februari", "generator": "same_date", "month": 2, "day": 30},
+            {"theme": "Trasig april", "generator": "same_date", "month": 4, "day": 31},
+        ],
+    )
+
+    rules = ThemeConfigLoader(hass).get_configs()
+    custom_themes = ("Egen dag", "Skottdag", "Trasig februari", "Trasig april")
+    custom_rules = [rule for rule in rules if rule.theme in custom_themes]
+    assert [(rule.theme, rule.month, rule.day) for rule in custom_rules] == [
+        ("Egen dag", 6, 1),
+        ("Skottdag", 2, 29),
+    ]
+    assert (tmp_path / "swedish_calendar" / "theme_rules.cache").exists()
+
+    with patch.object(ThemeConfigLoader, "_load_json") as load_json:
+        cached_rules = ThemeConfigLoader(hass).get_configs()
+    load_json.assert_not_called()
+    assert [rule.theme for rule in cached_rules] == [rule.theme for rule in rules]
+
+    _write_custom_themes(
+        tmp_path,
+        [{"theme": "Ny dag", "generator": "same_date", "month": 7, "day": 1}],
+    )
+    reloaded_rules = ThemeConfigLoader(hass).get_configs()
+    assert "Ny dag" in [rule.theme for rule in reloaded_rules]
+    assert "Egen dag" not in [rule.theme for rule in reloaded_rules]
+
+
+async def test_reload_changed_only_reloads_changed_files(hass, tmp_path):
+    """Only added, changed and removed custom files are reloaded."""
+    hass.config.config_dir = str(tmp_path)
+    _write_custom_themes(
+        tmp_path,
+        [{"theme": "Egen dag", "generator": "same_date", "month": 6, "day": 1}],
+    )
+    loader = ThemeConfigLoader(hass)
+    loader.get_configs()
+    generation = loader.generation
+
+    assert loader.reload_changed() is None
+    assert loader.generation == generation
+
+    _write_custom_themes(
+        tmp_path,
+        [{"theme": "Ny egen dag", "generator": "same_date", "month": 7, "day": 1}],
+    )
+    with patch.object(
+        ThemeConfigLoader, "_load_json", wraps=loader._load_json
+    ) as load_json:
+        affected_rules = loader.reload_changed()
+
+    assert load_json.call_count == 1
+    assert [rule.theme for rule in affected_rules] == ["Egen dag", "Ny egen dag"]
+    assert loader.generation == generation + 1
+    themes = [rule.theme for rule in loader.get_configs()]
+    assert "Ny egen dag" in themes
+    assert "Egen dag" not in themes
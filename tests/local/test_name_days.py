@@ -0,0 +1,20 @@
+"""Test local name days."""
+from datetime import date, timedelta
+
+from custom_components.swedish_calendar.local.name_days import NameDayProvider
+
+
+def test_get_names_for_range_matches_get_names():
+    """Names for a range match the names of each day, across a leap day and a new year."""
+    provider = NameDayProvider()
+    start = date(2023, 2, 27)
+    end = date(2024, 3, 2)
+
+    expected = [
+        provider.get_names((start + timedelta(days=n)).strftime("%m-%d"))
+        for n in range((end - start).days + 1)
+    ]
+
+    assert provider.get_names_for_range(start, end) == expected
+    assert provider.get_names("01-02") == ["Svea"]
+    assert provider.get_names("02-29") == []
@@ -0,0 +1,32 @@
+"""Test the lazy generator registry."""
+from custom_components.swedish_calendar.local.themes import registry
+from custom_components.swedish_calendar.local.themes.generators.easter import (
+    EasterGenerator,
+)
+from custom_components.swedish_calendar.local.themes.registry import GeneratorRegistry
+
+
+def test_get_loads_generator_on_first_use(mocker):
+    """A generator is imported on the first get, later gets return the same instance."""
+    import_module = mocker.spy(registry.importlib, "import_module")
+    generators = GeneratorRegistry()
+
+    assert generators._generators == {}
+    easter = generators.get("easter")
+
+    assert isinstance(easter, EasterGenerator)
+    assert generators.get("easter") is easter
+    assert list(generators._generators) == ["easter"]
+    import_module.assert_called_once_with(
+        "custom_components.swedish_calendar.local.themes.generators.easter"
+    )
+
+
+def test_get_unknown_generator_returns_none(mocker):
+    """An unknown name returns None without importing anything."""
+    import_module = mocker.spy(registry.importlib, "import_module")
+    generators = GeneratorRegistry()
+
+    assert generators.get("no_such_generator") is None
+    assert generators._generators == {}
+    import_module.assert_not_called()
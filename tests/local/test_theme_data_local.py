@@ -1,6 +1,7 @@
 """Test local theme data provider."""
 from datetime import date
 
+from custom_components.swedish_calendar.local.themes.loader import ThemeConfigLoader
 from custom_components.swedish_calendar.local.themes.theme_data_local import (
     LocalThemeDataProvider,
 )
@@ -23,3 +24,117 @@ async def test_fetch_data(hass):
     ]
 
     assert len(christmas_eves) == expected_christmas_count
+
+
+async def test_fetch_data_slices_memoized_year(hass):
+    """A year is generated once, later ranges in that year are sliced from memory."""
+    provider = LocalThemeDataProvider(hass=hass)
+    provider.invalidate()
+
+    provider.get_themes(start=date(2022, 1, 1), end=date(2022, 12, 31))
+    hits = provider._months.hits
+    themes = provider.get_themes(start=date(2022, 12, 24), end=date(2022, 12, 25))
+
+    assert provider._months.hits == hits + 1
+    assert [theme_data.date for theme_data in themes] == ["2022-12-24", "2022-12-25"]
+    assert "Julafton" in themes[0].themes
+
+
+async def test_reload_changed_drops_only_affected_months(hass, tmp_path):
+    """Changing a custom theme file only generates the months of its themes again."""
+    hass.config.config_dir = str(tmp_path)
+    themes_dir = tmp_path / "swedish_calendar" / "themes"
+    themes_dir.mkdir(parents=True)
+    custom_file = themes_dir / "custom.json"
+    custom_file.write_text(
+        '[{"theme": "Egen dag", "generator": "same_date", "month": 6, "day": 1}]'
+    )
+    provider = LocalThemeDataProvider(hass=hass)
+    original_loader = provider.config_loader
+    provider.config_loader = ThemeConfigLoader(hass)
+    try:
+        provider.get_themes(start=date(2022, 1, 1), end=date(2022, 12, 31))
+        assert provider.reload_changed() is False
+
+        custom_file.write_text(
+            '[{"theme": "Ny egen dag", "generator": "same_date", "month": 7, "day": 1}]'
+        )
+        assert provider.reload_changed() is True
+
+        assert len(provider._months) == 10  # June and July are generated again
+        june = provider.get_themes(start=date(2022, 6, 1), end=date(2022, 6, 1))
+        july = provider.get_themes(start=date(2022, 7, 1), end=date(2022, 7, 1))
+        assert "Egen dag" not in june[0].themes
+        assert "Ny egen dag" in july[0].themes
+    finally:
+        provider.config_loader = original_loader
+        provider.invalidate()
+        provider._months.clear()
+
+
+async def test_get_themes_keeps_dates_in_adjacent_year(hass, tmp_path):
+    """A date generated for one year that lands in the year before is not dropped."""
+    hass.config.config_dir = str(tmp_path)
+    themes_dir = tmp_path / "swedish_calendar" / "themes"
+    themes_dir.mkdir(parents=True)
+    # Monday of week 1 of 2025 is 30 December 2024
+    (themes_dir / "custom.json").write_text(
+        '[{"theme": "Första måndagen", "generator": "weekday_of_xth_week", "week": 1, "weekday": 1}]',
+        encoding="iso-8859-1",
+    )
+    provider = LocalThemeDataProvider(hass=hass)
+    original_loader = provider.config_loader
+    provider.config_loader = ThemeConfigLoader(hass)
+    try:
+        for (start, end) in [
+            (date(2024, 12, 1), date(2024, 12, 31)),
+            (date(2024, 11, 1), date(2025, 1, 31)),
+        ]:
+            provider.config_loader.get_configs(reload=True)
+            themes = {
+                theme_data.date: theme_data.themes
+                for theme_data in provider.get_themes(start=start, end=end)
+            }
+            assert themes["2024-12-30"].count("Första måndagen") == 1
+    finally:
+        provider.config_loader = original_loader
+        provider.invalidate()
+        provider._months.clear()
+
+
+async def test_reload_changed_drops_months_of_dates_in_adjacent_year(hass, tmp_path):
+    """A changed rule whose date lands in the year before the generated year drops that month."""
+    hass.config.config_dir = str(tmp_path)
+    themes_dir = tmp_path / "swedish_calendar" / "themes"
+    themes_dir.mkdir(parents=True)
+    custom_file = themes_dir / "custom.json"
+    # Monday of week 1 of 2025 is 30 December 2024
+    custom_file.write_text(
+        '[{"theme": "Första veckan", "generator": "weekday_of_xth_week", "week": 1, "weekday": 1}]',
+        encoding="iso-8859-1",
+    )
+    provider = LocalThemeDataProvider(hass=hass)
+    original_loader = provider.config_loader
+    provider.config_loader = ThemeConfigLoader(hass)
+    provider._months.clear()
+    try:
+        provider.get_themes(start=date(2024, 12, 1), end=date(2024, 12, 31))
+
+        custom_file.write_text(
+            '[{"theme": "Första veckan", "generator": "weekday_of_xth_week", "week": 1, "weekday": 2}]',
+            encoding="iso-8859-1",
+        )
+        assert provider.reload_changed() is True
+
+        themes = {
+            theme_data.date: theme_data.themes
+            for theme_data in provider.get_themes(
+                start=date(2024, 12, 30), end=date(2024, 12, 31)
+            )
+        }
+        assert "Första veckan" not in themes.get("2024-12-30", [])
+        assert "Första veckan" in themes["2024-12-31"]
+    finally:
+        provider.config_loader = original_loader
+        provider.invalidate()
+        provider._months.clear()
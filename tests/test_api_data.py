@@ -1,108 +1,375 @@
 """Tests for ApiData."""
-from datetime import datetime, timedelta, timezone
-import time
-from unittest import mock
-from unittest.mock import call
+import asyncio
+from datetime import date, datetime, timedelta
+import hashlib
+import os
 
-from custom_components.swedish_calendar.api_data import ApiDataCache
+from custom_components.swedish_calendar.api_data import ApiDataCache, ApiDataProvider
 from custom_components.swedish_calendar.types import CacheConfig
 
 
-def test_api_data_cache_has_data_for_returns_false_if_cache_is_disabled(mocker, hass):
-    """Disabled cache -> has_data_for returns False."""
-    config = _cache_is_disabled()  # This triggers has_data_for -> False
-    api_cache = ApiDataCache(hass=hass, cache_config=config)
+async def test_api_data_cache_lookup_returns_nothing_if_cache_is_disabled(
+    hass, tmp_path
+):
+    """Disabled cache -> lookup only returns misses, update writes nothing."""
+    api_cache = ApiDataCache(hass, _cache_is_disabled(tmp_path))
 
-    _cache_is_not_old(mocker)
-    _url_is_cached(mocker)
+    await api_cache.update([_api_json(date(2022, 6, 4))])
 
-    assert api_cache.has_data_for("https://whatever") is False
+    lookup = await api_cache.lookup(date(2022, 6, 4), date(2022, 6, 4))
 
+    assert lookup.hits == {}
+    assert lookup.missing == [date(2022, 6, 4)]
+    assert list(tmp_path.iterdir()) == []
 
-def test_api_data_cache_has_data_for_returns_false_if_cache_file_does_not_exist(
-    mocker, hass
+
+async def test_api_data_cache_lookup_returns_cached_days_in_range(hass, tmp_path):
+    """Days are stored once, and any range can be answered from them."""
+    api_cache = ApiDataCache(hass, _cache_is_enabled(tmp_path))
+    await api_cache.update([_api_json(date(2022, 6, day)) for day in range(1, 31)])
+
+    lookup = await api_cache.lookup(date(2022, 5, 31), date(2022, 6, 2))
+
+    assert list(lookup.hits.keys()) == ["2022-06-01", "2022-06-02"]
+    assert lookup.hits["2022-06-01"].date == "2022-06-01"
+    assert lookup.missing == [date(2022, 5, 31)]
+
+
+async def test_api_data_cache_lookup_ignores_days_older_than_retention(
+    mocker, hass, tmp_path
 ):
-    """Cache (file) does not exist -> has_data_for returns False."""
-    config = _cache_is_enabled()
-    api_cache = ApiDataCache(hass=hass, cache_config=config)
+    """Days fetched longer ago than the retention are not returned."""
+    api_cache = ApiDataCache(hass, _cache_is_enabled(tmp_path))
+    one_year_ago = datetime.now() - timedelta(days=365)
+    mocker.patch("time.time", return_value=one_year_ago.timestamp())
+    await api_cache.update([_api_json(date(2022, 6, 4))])
+    mocker.stopall()
+    await api_cache.update([_api_json(date(2022, 6, 5))])
 
-    _cache_is_not_old(mocker)
-    _url_is_not_cached(mocker)  # This triggers has_data_for -> False
+    lookup = await api_cache.lookup(date(2022, 6, 4), date(2022, 6, 5))
 
-    assert api_cache.has_data_for("https://whatever") is False
+    assert list(lookup.hits.keys()) == ["2022-06-05"]
+    assert lookup.missing == [date(2022, 6, 4)]
 
 
-def test_api_data_cache_has_data_for_returns_false_if_cache_file_is_old(mocker, hass):
-    """Cache is too old -> has_data_for returns False."""
-    config = _cache_is_enabled()
-    api_cache = ApiDataCache(hass=hass, cache_config=config)
+async def test_api_data_cache_lookup_uses_memory_cache_until_file_changes(
+    hass, tmp_path
+):
+    """A second lookup is served from memory, a changed file invalidates memory."""
+    api_cache = ApiDataCache(hass, _cache_is_enabled(tmp_path))
+    await api_cache.update([_api_json(date(2022, 6, 4))])
 
-    _cache_is_old(mocker)  # This triggers has_data_for -> False
-    _url_is_cached(mocker)
+    await api_cache.lookup(date(2022, 6, 4), date(2022, 6, 4))
+    await api_cache.lookup(date(2022, 6, 4), date(2022, 6, 4))
+    assert (api_cache.memory_cache.hits, api_cache.memory_cache.misses) == (1, 1)
 
-    assert api_cache.has_data_for("https://whatever") is False
+    other_cache = ApiDataCache(hass, _cache_is_enabled(tmp_path))
+    await other_cache.update([_api_json(date(2022, 6, 5))])
+    lookup = await api_cache.lookup(date(2022, 6, 4), date(2022, 6, 5))
 
+    assert api_cache.memory_cache.misses == 2
+    assert list(lookup.hits.keys()) == ["2022-06-04", "2022-06-05"]
 
-def test_api_data_cache_has_data_for_returns_true_if_all_conditions_are_true(
-    mocker, hass
+
+async def test_api_data_cache_lookup_notices_write_within_same_mtime(
+    hass, tmp_path
 ):
-    """Cache enabled + cached file exists + cache not too old -> has_data_for returns True."""
-    config = _cache_is_enabled()
-    api_cache = ApiDataCache(hass=hass, cache_config=config)
+    """A write that keeps the mtime and size of the file (coarse mtime) still invalidates memory."""
+    api_cache = ApiDataCache(hass, _cache_is_enabled(tmp_path))
+    await api_cache.update([_api_json(date(2022, 6, 4))])
+    await api_cache.lookup(date(2022, 6, 4), date(2022, 6, 4))
+    cache_file = tmp_path / "api_data.json"
+    mtime_ns = cache_file.stat().st_mtime_ns
+
+    other_cache = ApiDataCache(hass, _cache_is_enabled(tmp_path))
+    await other_cache.update([{**_api_json(date(2022, 6, 4)), "veckodag": "Tisdag"}])
+    os.utime(cache_file, ns=(mtime_ns, mtime_ns))
+    lookup = await api_cache.lookup(date(2022, 6, 4), date(2022, 6, 4))
+
+    assert lookup.hits["2022-06-04"].weekday == "Tisdag"
 
-    _cache_is_not_old(mocker)
-    _url_is_cached(mocker)
 
-    assert api_cache.has_data_for("https://whatever") is True
+async def test_api_data_cache_compact_removes_expired_and_legacy_files(
+    mocker, hass, tmp_path
+):
+    """Compaction removes expired days and, once, the md5(url) named files of the old format."""
+    api_cache = ApiDataCache(hass, _cache_is_enabled(tmp_path))
+    legacy_file = tmp_path / f"{_md5('https://sholiday.faboul.se/dagar/v2.1/2022/6')}.json"
+    legacy_file.write_text('{"dagar": []}')
+    other_file = tmp_path / f"{_md5('something else')}.json"
+    other_file.write_text("{}")
+    one_year_ago = datetime.now() - timedelta(days=365)
+    mocker.patch("time.time", return_value=one_year_ago.timestamp())
+    await api_cache.update([_api_json(date(2022, 6, 4))])
+    mocker.stopall()
+    await api_cache.update([_api_json(date(2022, 6, 5))])
 
+    reclaimed = await api_cache._async_compact()
+    lookup = await api_cache.lookup(date(2022, 6, 4), date(2022, 6, 5))
 
-async def test_api_data_cache_get_removes_file_on_json_decode_error(mocker, hass):
-    """Get cached url removes cache entry if json is malformed."""
-    remove_mock = mocker.patch("os.remove")
-    config = _cache_is_enabled()
+    assert reclaimed > 0
+    assert not legacy_file.exists()
+    assert other_file.exists()
+    assert list(lookup.hits.keys()) == ["2022-06-05"]
+
+    legacy_file.write_text('{"dagar": []}')
+    await api_cache._async_compact()
+    assert legacy_file.exists()
+
+
+async def test_api_data_cache_compact_evicts_least_recently_used_days(
+    hass, tmp_path
+):
+    """Compaction evicts least recently used days until max_size is respected."""
+    config = _cache_is_enabled(tmp_path)
+    config.max_size = 1000
     api_cache = ApiDataCache(hass, config)
-    expected_file_path = "ecc5e2d8d57c91749b379bc26d1f677a.json"
+    await api_cache.update([_api_json(date(2022, 6, day)) for day in range(1, 11)])
+    await api_cache.lookup(date(2022, 6, 10), date(2022, 6, 10))
 
-    mock_open = mock.mock_open(read_data="<html>")
-    with mock.patch("builtins.open", mock_open):
-        result = await api_cache.get("https://whatever")
+    await api_cache._async_compact()
+    lookup = await api_cache.lookup(date(2022, 6, 1), date(2022, 6, 10))
 
-        assert result is None
-        remove_mock.assert_has_calls(calls=[call(expected_file_path)], any_order=True)
+    assert (tmp_path / "api_data.json").stat().st_size <= 1000
+    assert (tmp_path / "api_data.json").stat().st_size > 1000 - 250  # Only evicts what is needed
+    assert "2022-06-10" in lookup.hits
+    assert "2022-06-01" not in lookup.hits
 
 
-def _cache_is_not_old(mocker):
-    now_in_seconds = time.mktime(datetime.now().astimezone(timezone.utc).timetuple())
-    _set_cache_age(mocker, now_in_seconds)
+async def test_api_data_cache_lookup_updates_last_used_under_lock(hass, tmp_path):
+    """Last used times of hits are written while holding the lock that compaction uses."""
+    api_cache = ApiDataCache(hass, _cache_is_enabled(tmp_path))
+    await api_cache.update([_api_json(date(2022, 6, 4))])
+    api_cache._last_used = _LockedDict()
+
+    await api_cache.lookup(date(2022, 6, 4), date(2022, 6, 5))
+
+    assert list(api_cache._last_used.keys()) == ["2022-06-04"]
+
+
+async def test_api_data_cache_lookup_removes_file_on_json_decode_error(
+    hass, tmp_path
+):
+    """Lookup removes the cache file if json is malformed."""
+    api_cache = ApiDataCache(hass, _cache_is_enabled(tmp_path))
+    cache_file = tmp_path / "api_data.json"
+    cache_file.write_text("<html>")
+
+    lookup = await api_cache.lookup(date(2022, 6, 4), date(2022, 6, 4))
+
+    assert lookup.hits == {}
+    assert not cache_file.exists()
+
+
+async def test_api_data_provider_fetch_data_limits_in_flight_and_keeps_date_order(
+    mocker, hass
+):
+    """Urls are fetched in parallel, bounded by max_parallel_requests, in date order."""
+    provider = ApiDataProvider(
+        hass,
+        session=None,
+        cache_config=_cache_is_disabled(""),
+        max_parallel_requests=2,
+    )
+    in_flight = 0
+    max_in_flight = 0
+
+    async def _get_data_online(url, timeout):
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        month = int(url.split("/")[-1])
+        await asyncio.sleep((12 - month) / 1000)  # Later months respond faster
+        in_flight -= 1
+        return {"dagar": [_api_json(date(2022, month, 1))]}
+
+    mocker.patch.object(provider, "_get_data_online", _get_data_online)
+
+    api_data = await provider.fetch_data(date(2022, 1, 1), date(2022, 6, 30))
+
+    assert max_in_flight == 2
+    assert [data.date for data in api_data] == [
+        f"2022-0{month}-01" for month in range(1, 7)
+    ]
+
+
+async def test_api_data_provider_fetch_data_writes_cache_once(mocker, hass, tmp_path):
+    """All urls of one fetch are cached with a single write."""
+    provider = ApiDataProvider(
+        hass, session=None, cache_config=_cache_is_enabled(tmp_path)
+    )
 
+    async def _get_data_online(url, timeout):
+        return {"dagar": [_api_json(date(2022, int(url.split("/")[-1]), 1))]}
 
-def _cache_is_old(mocker):
+    mocker.patch.object(provider, "_get_data_online", _get_data_online)
+    save = mocker.spy(provider._cache, "_save")
+
+    await provider.fetch_data(date(2022, 1, 1), date(2022, 6, 30))
+
+    assert save.call_count == 1
+    assert len(save.call_args.args[0]) == 6
+
+
+async def test_api_data_provider_fetch_data_only_fetches_days_missing_in_cache(
+    mocker, hass, tmp_path
+):
+    """Days already in the cache are not fetched again."""
+    provider = ApiDataProvider(
+        hass, session=None, cache_config=_cache_is_enabled(tmp_path)
+    )
+    requested_urls = []
+
+    async def _get_data_online(url, timeout):
+        requested_urls.append(url)
+        [year, month, day] = [int(part) for part in url.split("/")[-3:]]
+        return {"dagar": [_api_json(date(year, month, day))]}
+
+    mocker.patch.object(provider, "_get_data_online", _get_data_online)
+
+    await provider.fetch_data(date(2022, 6, 4), date(2022, 6, 5))
+    api_data = await provider.fetch_data(date(2022, 6, 4), date(2022, 6, 6))
+
+    assert [url.split("v2.1/")[1] for url in requested_urls] == [
+        "2022/6/4",
+        "2022/6/5",
+        "2022/6/6",
+    ]
+    assert [data.date for data in api_data] == [
+        "2022-06-04",
+        "2022-06-05",
+        "2022-06-06",
+    ]
+
+
+async def test_api_data_provider_stale_while_revalidate_serves_stale_days(
+    mocker, hass, tmp_path
+):
+    """Expired days are returned at once and revalidated in the background."""
+    config = _cache_is_enabled(tmp_path)
+    config.stale_while_revalidate = True
+    revalidated = []
+    provider = ApiDataProvider(
+        hass, session=None, cache_config=config, on_revalidated=revalidated.extend
+    )
     one_year_ago = datetime.now() - timedelta(days=365)
-    one_year_ago_in_seconds = time.mktime(
-        one_year_ago.astimezone(timezone.utc).timetuple()
+    mocker.patch("time.time", return_value=one_year_ago.timestamp())
+    await provider._cache.update([_api_json(date(2022, 6, 4))])
+    mocker.stopall()
+
+    async def _get_data_online(url, timeout):
+        return {"dagar": [_api_json(date(2022, 6, 4))]}
+
+    mocker.patch.object(provider, "_get_data_online", _get_data_online)
+
+    api_data = await provider.fetch_data(date(2022, 6, 4), date(2022, 6, 4))
+    assert [data.date for data in api_data] == ["2022-06-04"]
+    assert revalidated == []
+
+    await provider._revalidate_task
+    assert [data.date for data in revalidated] == ["2022-06-04"]
+
+
+async def test_api_data_provider_stale_while_revalidate_runs_one_revalidation(
+    mocker, hass, tmp_path
+):
+    """A running revalidation is not replaced by a new one, and can be cancelled."""
+    config = _cache_is_enabled(tmp_path)
+    config.stale_while_revalidate = True
+    provider = ApiDataProvider(hass, session=None, cache_config=config)
+    one_year_ago = datetime.now() - timedelta(days=365)
+    mocker.patch("time.time", return_value=one_year_ago.timestamp())
+    await provider._cache.update([_api_json(date(2022, 6, 4))])
+    mocker.stopall()
+    online = asyncio.Event()
+
+    async def _get_data_online(url, timeout):
+        await online.wait()
+        return {"dagar": [_api_json(date(2022, 6, 4))]}
+
+    mocker.patch.object(provider, "_get_data_online", _get_data_online)
+
+    await provider.fetch_data(date(2022, 6, 4), date(2022, 6, 4))
+    revalidate_task = provider._revalidate_task
+    await provider.fetch_data(date(2022, 6, 4), date(2022, 6, 4))
+    assert provider._revalidate_task is revalidate_task
+
+    in_flight_calls = list(ApiDataProvider._in_flight_urls._in_flight.values())
+    provider.async_cancel_revalidation()
+    await asyncio.wait([revalidate_task])
+    assert revalidate_task.cancelled()
+
+    online.set()  # The shared download itself is not cancelled, let it finish
+    await asyncio.gather(*in_flight_calls)
+
+
+def test_api_data_provider_url_patterns_over_new_year_uses_months():
+    """Dec 20 - Jan 10 -> two month patterns instead of two whole years."""
+    patterns = ApiDataProvider._get_url_patterns_for_date_range(
+        date(2022, 12, 20), date(2023, 1, 10)
+    )
+
+    assert patterns == ["2022/12", "2023/1"]
+
+
+def test_api_data_provider_url_patterns_few_days_uses_days():
+    """One or two days -> day patterns, a single day is never fetched as a month."""
+    assert ApiDataProvider._get_url_patterns_for_date_range(
+        date(2022, 6, 4), date(2022, 6, 4)
+    ) == ["2022/6/4"]
+    assert ApiDataProvider._get_url_patterns_for_date_range(
+        date(2022, 6, 30), date(2022, 7, 1)
+    ) == ["2022/6/30", "2022/7/1"]
+
+
+def test_api_data_provider_url_patterns_many_months_uses_year():
+    """7 months are cheaper as months, 8 months are cheaper as a whole year."""
+    assert ApiDataProvider._get_url_patterns_for_date_range(
+        date(2022, 1, 1), date(2022, 7, 31)
+    ) == [f"2022/{month}" for month in range(1, 8)]
+    assert ApiDataProvider._get_url_patterns_for_date_range(
+        date(2022, 1, 1), date(2022, 8, 31)
+    ) == ["2022"]
+
+
+def test_api_data_provider_url_patterns_for_dates_only_covers_given_dates():
+    """Only the given (missing) days are planned, not the whole range."""
+    patterns = ApiDataProvider._get_url_patterns_for_dates(
+        [date(2022, 3, 1), date(2022, 4, 1), date(2022, 4, 2), date(2022, 4, 3)]
     )
-    _set_cache_age(mocker, one_year_ago_in_seconds)
 
+    assert patterns == ["2022/3/1", "2022/4"]
 
-def _set_cache_age(mocker, time_in_seconds):
-    mocker.patch("os.path.getmtime", return_value=time_in_seconds)
 
+class _LockedDict(dict):
+    def __setitem__(self, key, value):
+        assert ApiDataCache._lock.locked()
+        super().__setitem__(key, value)
 
-def _url_is_not_cached(mocker):
-    _set_if_url_cache_exists(mocker, False)
+    def update(self, *args, **kwargs):
+        assert ApiDataCache._lock.locked()
+        super().update(*args, **kwargs)
 
 
-def _url_is_cached(mocker):
-    _set_if_url_cache_exists(mocker, True)
+def _api_json(day: date) -> dict:
+    return {
+        "datum": day.isoformat(),
+        "veckodag": "Måndag",
+        "arbetsfri dag": "Nej",
+        "röd dag": "Nej",
+        "vecka": "1",
+        "dag i vecka": "1",
+        "namnsdag": [],
+    }
 
 
-def _set_if_url_cache_exists(mocker, exists: bool):
-    mocker.patch("os.path.exists", return_value=exists)
+def _cache_is_enabled(cache_dir) -> CacheConfig:
+    return CacheConfig(enabled=True, cache_dir=str(cache_dir), retention=timedelta(days=7))
 
 
-def _cache_is_enabled() -> CacheConfig:
-    return CacheConfig(enabled=True, cache_dir="", retention=timedelta(days=7))
+def _cache_is_disabled(cache_dir) -> CacheConfig:
+    return CacheConfig(enabled=False, cache_dir=str(cache_dir), retention=timedelta(days=7))
 
 
-def _cache_is_disabled() -> CacheConfig:
-    return CacheConfig(enabled=False, cache_dir="", retention=timedelta(days=7))
+def _md5(text: str) -> str:
+    return hashlib.md5(text.encode(), usedforsecurity=False).hexdigest()
@@ -0,0 +1,185 @@
+"""Tests for CalendarDataCoordinator."""
+from datetime import date, timedelta
+
+from custom_components.swedish_calendar.const import CONF_EXCLUDE
+from custom_components.swedish_calendar.coordinator import CalendarDataCoordinator
+from custom_components.swedish_calendar.local.themes.theme_data_local import (
+    LocalThemeDataProvider,
+)
+from custom_components.swedish_calendar.types import (
+    ApiData,
+    CacheConfig,
+    CalendarConfig,
+    SpecialThemesConfig,
+    SwedishCalendar,
+    ThemeData,
+)
+
+isodate = date.fromisoformat
+
+
+def test_missing_ranges_empty_cache_returns_whole_window():
+    """Nothing cached -> the whole window is missing."""
+    missing = CalendarDataCoordinator._missing_ranges(
+        {}, isodate("2022-12-20"), isodate("2023-01-10")
+    )
+
+    assert missing == [(isodate("2022-12-20"), isodate("2023-01-10"))]
+
+
+def test_missing_ranges_slid_window_returns_only_new_days():
+    """Window moved one day forward -> only the new last day is missing."""
+    cached = {
+        isodate("2022-06-04"): SwedishCalendar(),
+        isodate("2022-06-05"): SwedishCalendar(),
+    }
+    missing = CalendarDataCoordinator._missing_ranges(
+        cached, isodate("2022-06-04"), isodate("2022-06-06")
+    )
+
+    assert missing == [(isodate("2022-06-06"), isodate("2022-06-06"))]
+
+
+def test_missing_ranges_returns_gaps():
+    """Gaps in the cache are returned as separate ranges."""
+    cached = {
+        isodate("2022-06-05"): SwedishCalendar(),
+        isodate("2022-06-07"): SwedishCalendar(),
+    }
+    missing = CalendarDataCoordinator._missing_ranges(
+        cached, isodate("2022-06-04"), isodate("2022-06-08")
+    )
+
+    assert missing == [
+        (isodate("2022-06-04"), isodate("2022-06-04")),
+        (isodate("2022-06-06"), isodate("2022-06-06")),
+        (isodate("2022-06-08"), isodate("2022-06-08")),
+    ]
+
+
+def test_missing_ranges_days_without_api_data_are_missing_if_required():
+    """Days with only themes are fetched again if api data is required."""
+    cached = {
+        isodate("2022-06-04"): SwedishCalendar.from_api_data(
+            ApiData(
+                "2022-06-04", "Lördag", True, False, 22, 6, [], None, None, None, False
+            )
+        ),
+        isodate("2022-06-05"): SwedishCalendar.from_themes(
+            ThemeData("2022-06-05", ["Egen dag"])
+        ),
+    }
+
+    assert CalendarDataCoordinator._missing_ranges(
+        cached, isodate("2022-06-04"), isodate("2022-06-05")
+    ) == []
+    assert CalendarDataCoordinator._missing_ranges(
+        cached,
+        isodate("2022-06-04"),
+        isodate("2022-06-05"),
+        api_data_required=True,
+    ) == [(isodate("2022-06-05"), isodate("2022-06-05"))]
+
+
+async def test_update_data_fetches_days_without_api_data_again(hass, monkeypatch):
+    """Days that the api returned nothing for are fetched on the next refresh."""
+    monkeypatch.setattr(LocalThemeDataProvider, "_instance", None)
+    coordinator = _local_coordinator(hass)
+    api_data_provider = coordinator._api_data_provider
+    fetch_calendar_data = api_data_provider.fetch_calendar_data
+
+    async def _fetch_without_api_data(start, end):
+        (_, themes) = await fetch_calendar_data(start, end)
+        return ([], themes)
+
+    monkeypatch.setattr(
+        api_data_provider, "fetch_calendar_data", _fetch_without_api_data
+    )
+    calendars = await coordinator.update_data()
+    assert all(not calendar.has_api_data() for calendar in calendars.values())
+
+    monkeypatch.setattr(
+        api_data_provider, "fetch_calendar_data", fetch_calendar_data
+    )
+    calendars = await coordinator.update_data()
+    today = date.today()
+    assert calendars[today].get_value_by_attribute("date") == today.isoformat()
+    assert coordinator.recomputed_days == 2
+
+
+async def test_update_data_keeps_window_if_recomputing_it_fails(hass, monkeypatch):
+    """A failed fetch after the themes changed keeps serving the previous window."""
+    monkeypatch.setattr(LocalThemeDataProvider, "_instance", None)
+    coordinator = _local_coordinator(hass)
+    calendars = await coordinator.update_data()
+    api_data_provider = coordinator._api_data_provider
+    fetch_calendar_data = api_data_provider.fetch_calendar_data
+
+    async def _fail(start, end):
+        raise RuntimeError("Fetch failed")
+
+    coordinator._theme_provider.invalidate()
+    monkeypatch.setattr(api_data_provider, "fetch_calendar_data", _fail)
+    assert await coordinator.update_data() == calendars
+
+    monkeypatch.setattr(
+        api_data_provider, "fetch_calendar_data", fetch_calendar_data
+    )
+    await coordinator.update_data()
+    assert coordinator.recomputed_days == 2
+
+
+async def test_custom_themes_reloaded_by_one_entry_refresh_all_entries(
+    hass, tmp_path, monkeypatch
+):
+    """Every entry serves the new custom themes, not only the entry whose poll reloaded them."""
+    hass.config.config_dir = str(tmp_path)
+    themes_dir = tmp_path / "swedish_calendar" / "themes"
+    themes_dir.mkdir(parents=True)
+    custom_file = themes_dir / "custom.json"
+    today = date.today()
+    custom_file.write_text(
+        '[{"theme": "Egen dag", "generator": "same_date", "month": %d, "day": %d}]'
+        % (today.month, today.day)
+    )
+    # The entries share a theme provider of their own, the process wide one keeps the hass that created it
+    monkeypatch.setattr(LocalThemeDataProvider, "_instance", None)
+    coordinators = [_local_coordinator(hass), _local_coordinator(hass)]
+    refreshes = []
+    for coordinator in coordinators:
+        await coordinator.update_data()
+        coordinator.async_request_refresh = _record(refreshes, coordinator)
+
+    for coordinator in coordinators:
+        await coordinator._async_reload_custom_themes()
+    assert refreshes == []
+
+    custom_file.write_text(
+        '[{"theme": "Ny egen dag", "generator": "same_date", "month": %d, "day": %d}]'
+        % (today.month, today.day)
+    )
+    for coordinator in coordinators:
+        await coordinator._async_reload_custom_themes()
+    assert refreshes == coordinators
+
+    for coordinator in coordinators:
+        calendars = await coordinator.update_data()
+        assert "Ny egen dag" in calendars[today].get_value_by_attribute("themes")
+
+
+def _local_coordinator(hass):
+    return CalendarDataCoordinator(
+        hass,
+        SpecialThemesConfig(path=None, auto_update=False),
+        CalendarConfig(includes=[], days_before_today=0, days_after_today=1),
+        CacheConfig(enabled=False, cache_dir="", retention=timedelta(days=1)),
+        is_local_mode=True,
+        conf={CONF_EXCLUDE: []},
+    )
+
+
+def _record(refreshes, coordinator):
+    async def _async_request_refresh():
+        refreshes.append(coordinator)
+
+    return _async_request_refresh
@@ -0,0 +1,78 @@
+"""Tests for ThemeData."""
+from datetime import date
+import json
+
+from custom_components.swedish_calendar import theme_index
+from custom_components.swedish_calendar.theme_data import (
+    ThemeDataProvider,
+    ThemeDataUpdater,
+)
+from custom_components.swedish_calendar.theme_index import ThemeDateIndex
+from custom_components.swedish_calendar.types import SpecialThemesConfig
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+
+_THEMES_JSON = json.dumps({"themeDays": {"20221224": [{"event": "Julafton"}]}})
+
+
+def _updater(hass, tmp_path):
+    config = SpecialThemesConfig(str(tmp_path / "specialThemes.json"), True)
+    return ThemeDataUpdater(hass, config, async_get_clientsession(hass))
+
+
+async def test_theme_data_updater_writes_new_themes_and_sends_etag_next_time(
+    hass, tmp_path, aioclient_mock
+):
+    """New themes are written, the next download is conditional on the ETag."""
+    updater = _updater(hass, tmp_path)
+    aioclient_mock.get(updater._url, text=_THEMES_JSON, headers={"ETag": '"v1"'})
+
+    assert await updater.update()
+    assert (tmp_path / "specialThemes.json").read_text() == _THEMES_JSON
+
+    aioclient_mock.clear_requests()
+    aioclient_mock.get(updater._url, status=304)
+
+    assert not await updater.update()
+    assert aioclient_mock.mock_calls[0][3]["If-None-Match"] == '"v1"'
+    assert (tmp_path / "specialThemes.json").read_text() == _THEMES_JSON
+
+
+async def test_theme_data_updater_skips_identical_themes(
+    hass, tmp_path, aioclient_mock
+):
+    """Downloaded themes identical to the current file are not written."""
+    updater = _updater(hass, tmp_path)
+    (tmp_path / "specialThemes.json").write_text(_THEMES_JSON)
+    aioclient_mock.get(updater._url, text=_THEMES_JSON)
+
+    assert not await updater.update()
+    assert aioclient_mock.mock_calls[0][3].get("If-None-Match") is None
+
+
+def test_theme_data_provider_closes_invalidated_index_after_last_reader(hass, tmp_path):
+    """An index invalidated while a query reads it is closed once the query is done."""
+    (tmp_path / "specialThemes.json").write_text(_THEMES_JSON)
+    provider = ThemeDataProvider(hass, str(tmp_path / "specialThemes.json"))
+
+    index = provider._acquire_index()
+    provider.invalidate()
+    themes = index.query(date(2022, 12, 24), date(2022, 12, 24))
+    provider._release_index(index)
+
+    assert [theme.themes for theme in themes] == [["Julafton"]]
+    assert provider._readers == {}
+    assert provider._retired == set()
+
+
+def test_theme_data_provider_falls_back_to_json(hass, tmp_path, monkeypatch):
+    """Themes that can not be compiled into an index are queried from the parsed json."""
+    monkeypatch.setattr(theme_index, "_MAX_THEME_NAMES", 0)
+    (tmp_path / "specialThemes.json").write_text(_THEMES_JSON)
+    provider = ThemeDataProvider(hass, str(tmp_path / "specialThemes.json"))
+
+    themes = provider._fetch_data(date(2022, 12, 1), date(2022, 12, 31))
+
+    assert isinstance(provider._index, ThemeDateIndex)
+    assert [(theme.date, theme.themes) for theme in themes] == [
+        ("2022-12-24", ["Julafton"])
+    ]
@@ -0,0 +1,79 @@
+"""Tests for the compiled special themes index."""
+from datetime import date
+import os
+
+import pytest
+
+from custom_components.swedish_calendar import theme_index
+from custom_components.swedish_calendar.theme_index import (
+    CompiledThemeIndex,
+    ThemeDateIndex,
+)
+
+_THEMES_JSON = {
+    "themeDays": {
+        "20221224": [{"event": "Julafton", "link": ""}],
+        "20221225": [{"event": "Juldagen", "link": ""}],
+        "20221231": [
+            {"event": "Nyårsafton", "link": ""},
+            {"event": "Julafton", "link": ""},
+        ],
+    }
+}
+
+
+def _write_index(tmp_path, mtime_ns=1, size=2):
+    index_path = os.path.join(tmp_path, "specialThemes.idx")
+    with open(index_path, "wb") as index_file:
+        index_file.write(CompiledThemeIndex.compile(_THEMES_JSON, mtime_ns, size))
+    return index_path
+
+
+def test_query_returns_themes_in_range(tmp_path):
+    """Only days with themes inside the range are returned, names are shared."""
+    index = CompiledThemeIndex.open(_write_index(tmp_path), 1, 2)
+
+    themes = index.query(date(2022, 12, 25), date(2023, 1, 31))
+
+    assert [(theme.date, theme.themes) for theme in themes] == [
+        ("2022-12-25", ["Juldagen"]),
+        ("2022-12-31", ["Nyårsafton", "Julafton"]),
+    ]
+    assert index.query(date(2021, 1, 1), date(2022, 12, 23)) == []
+    index.close()
+
+
+def test_open_rejects_index_of_other_source(tmp_path):
+    """An index compiled from another version of the json is not used."""
+    index_path = _write_index(tmp_path, mtime_ns=1, size=2)
+
+    assert CompiledThemeIndex.open(index_path, 3, 2) is None
+    assert CompiledThemeIndex.open(index_path, 1, 4) is None
+    assert CompiledThemeIndex.open(os.path.join(tmp_path, "missing.idx"), 1, 2) is None
+
+
+def test_compile_rejects_more_themes_than_ids(monkeypatch):
+    """More distinct themes than fit in a theme id can not be compiled."""
+    monkeypatch.setattr(theme_index, "_MAX_THEME_NAMES", 1)
+
+    with pytest.raises(ValueError):
+        CompiledThemeIndex.compile(_THEMES_JSON, 1, 2)
+
+
+def test_theme_date_index_query_matches_compiled_index(tmp_path):
+    """The parsed json fallback answers queries like the compiled index."""
+    compiled = CompiledThemeIndex.open(_write_index(tmp_path), 1, 2)
+
+    for (start, end) in [
+        (date(2022, 12, 25), date(2023, 1, 31)),
+        (date(2021, 1, 1), date(2022, 12, 23)),
+        (date(2022, 12, 24), date(2022, 12, 24)),
+    ]:
+        assert _dates_and_themes(
+            ThemeDateIndex(_THEMES_JSON).query(start, end)
+        ) == _dates_and_themes(compiled.query(start, end))
+    compiled.close()
+
+
+def _dates_and_themes(theme_dates):
+    return [(theme.date, theme.themes) for theme in theme_dates]
@@ -20,3 +20,45 @@ def test_api_data__to_optional():
     """Test ApiData._to_optional."""
     assert ApiData._to_optional({"flag_day": "Nej"}, "flag_day") == "Nej"
     assert ApiData._to_optional({}, "flag_day") is None
+
+
+def test_api_data_with_bridge_days():
+    """Test ApiData.with_bridge_days, Friday after Kristi himmelsfärdsdag 2023."""
+    work_free_days = {
+        "2023-05-17": False,
+        "2023-05-18": True,
+        "2023-05-19": False,
+        "2023-05-20": True,
+        "2023-05-21": True,
+    }
+    swedish_dates = [
+        ApiData(
+            date=iso_date,
+            weekday="",
+            work_free_day=work_free,
+            red_day=False,
+            week=20,
+            day_of_week_index=1,
+            name_day=[],
+            reason_for_flagging=None,
+            eve=None,
+            holiday=None,
+            day_before_work_free_holiday=False,
+        )
+        for (iso_date, work_free) in work_free_days.items()
+    ]
+
+    marked = ApiData.with_bridge_days(swedish_dates)
+
+    assert not any(api_data.bridge_day for api_data in swedish_dates)
+    assert [api_data.bridge_day for api_data in marked] == [
+        False,
+        False,
+        True,
+        False,
+        False,
+    ]
+    unsorted_marked = ApiData.with_bridge_days(list(reversed(swedish_dates)))
+    assert [(api_data.date, api_data.bridge_day) for api_data in unsorted_marked] == [
+        (api_data.date, api_data.bridge_day) for api_data in marked
+    ]
@@ -1,7 +1,8 @@
 """Test util functions."""
+import asyncio
 from datetime import date, datetime, time, timedelta
 
-from custom_components.swedish_calendar.utils import DateUtils
+from custom_components.swedish_calendar.utils import DateUtils, LruCache, SingleFlight
 
 isodate = date.fromisoformat
 
@@ -72,6 +73,46 @@ def test_seconds_until_midnight_no_argument_returns_now():
     assert first > second
 
 
+def test_months():
+    """Test DateUtils.months, over a new year."""
+    months = DateUtils.months(start=isodate("2022-11-30"), end=isodate("2023-01-01"))
+
+    assert list(months) == [(2022, 11), (2022, 12), (2023, 1)]
+
+
+def test_lru_cache_evicts_least_recently_used():
+    """Test LruCache, the least recently used entry is evicted."""
+    cache = LruCache(capacity=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert (cache.hits, cache.misses, cache.evictions) == (2, 1, 1)
+
+
+async def test_single_flight_coalesces_concurrent_calls():
+    """Test SingleFlight, concurrent calls with the same key share one call."""
+    single_flight = SingleFlight()
+    calls = 0
+
+    async def _call():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return calls
+
+    results = await asyncio.gather(
+        single_flight.run("key", _call), single_flight.run("key", _call)
+    )
+
+    assert results == [1, 1]
+    assert single_flight.coalesced == 1
+    assert await single_flight.run("key", _call) == 2
+
+
 def _today_at(t: time) -> datetime:
     return datetime.combine(date.today(), t)
 